@@ -0,0 +1,236 @@
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+from sqlalchemy import text
+from app.core import providers
+from app.core.database import engine
+
+# 여러 worker/노드 간 조정: lease(소유권 + 만료), 공유 캐시, single-flight
+# 기본은 DB(coord_leases / coord_cache), COORDINATION_URL=redis://... 이면 Redis 사용
+
+COORDINATION_URL = os.getenv("COORDINATION_URL", "")
+LEASE_TTL_SECONDS = float(os.getenv("COORD_LEASE_TTL", "30"))
+# single-flight 결과를 다른 worker 가 가져갈 수 있도록 남겨두는 시간
+SINGLE_FLIGHT_RESULT_TTL = float(os.getenv("SINGLE_FLIGHT_RESULT_TTL", "30"))
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv("SINGLE_FLIGHT_WAIT", "60"))
+_POLL_SECONDS = 0.2
+
+_worker_id = None
+_worker_pid = None
+
+
+def worker_id() -> str:
+    # gunicorn preload 로 fork 된 경우에도 프로세스마다 달라야 함
+    global _worker_id, _worker_pid
+    if _worker_pid != os.getpid():
+        _worker_pid = os.getpid()
+        _worker_id = f"{socket.gethostname()}:{_worker_pid}:{uuid.uuid4().hex[:6]}"
+    return _worker_id
+
+
+class DatabaseCoordinator:
+    def acquire(self, key: str, owner: str, ttl: float = LEASE_TTL_SECONDS) -> bool:
+        now = time.time()
+        with engine.begin() as conn:
+            res = conn.execute(
+                text(
+                    "INSERT INTO coord_leases (key, owner, expires_at) VALUES (:key, :owner, :exp) "
+                    "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                    "WHERE coord_leases.expires_at < :now OR coord_leases.owner = :owner"
+                ),
+                {"key": key, "owner": owner, "exp": now + ttl, "now": now},
+            )
+            return res.rowcount == 1
+
+    def renew(self, key: str, owner: str, ttl: float = LEASE_TTL_SECONDS) -> bool:
+        with engine.begin() as conn:
+            res = conn.execute(
+                text("UPDATE coord_leases SET expires_at = :exp WHERE key = :key AND owner = :owner"),
+                {"key": key, "owner": owner, "exp": time.time() + ttl},
+            )
+            return res.rowcount == 1
+
+    def release(self, key: str, owner: str) -> None:
+        with engine.begin() as conn:
+            conn.execute(
+                text("DELETE FROM coord_leases WHERE key = :key AND owner = :owner"),
+                {"key": key, "owner": owner},
+            )
+
+    def cache_get(self, key: str) -> Optional[str]:
+        with engine.connect() as conn:
+            return conn.execute(
+                text("SELECT value FROM coord_cache WHERE key = :key AND expires_at >= :now"),
+                {"key": key, "now": time.time()},
+            ).scalar()
+
+    def cache_set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM coord_cache WHERE expires_at < :now"), {"now": now})
+            conn.execute(
+                text(
+                    "INSERT INTO coord_cache (key, value, expires_at) VALUES (:key, :value, :exp) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at"
+                ),
+                {"key": key, "value": value, "exp": now + ttl},
+            )
+
+    def cache_delete(self, key: str) -> None:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM coord_cache WHERE key = :key"), {"key": key})
+
+
+# owner 가 일치할 때만 연장/삭제 (다른 worker 가 가져간 lease 를 건드리지 않도록)
+_REDIS_RENEW = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_REDIS_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisCoordinator:
+    def __init__(self, client, prefix: str = "myapi:"):
+        self.client = client
+        self.prefix = prefix
+        self._renew = client.register_script(_REDIS_RENEW)
+        self._release = client.register_script(_REDIS_RELEASE)
+
+    def _lease_key(self, key: str) -> str:
+        return f"{self.prefix}lease:{key}"
+
+    def _cache_key(self, key: str) -> str:
+        return f"{self.prefix}cache:{key}"
+
+    def acquire(self, key: str, owner: str, ttl: float = LEASE_TTL_SECONDS) -> bool:
+        lk = self._lease_key(key)
+        if self.client.set(lk, owner, nx=True, px=int(ttl * 1000)):
+            return True
+        # 재진입: 이미 내 lease 면 연장
+        return bool(self._renew(keys=[lk], args=[owner, int(ttl * 1000)]))
+
+    def renew(self, key: str, owner: str, ttl: float = LEASE_TTL_SECONDS) -> bool:
+        return bool(self._renew(keys=[self._lease_key(key)], args=[owner, int(ttl * 1000)]))
+
+    def release(self, key: str, owner: str) -> None:
+        self._release(keys=[self._lease_key(key)], args=[owner])
+
+    def cache_get(self, key: str) -> Optional[str]:
+        value = self.client.get(self._cache_key(key))
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        return value
+
+    def cache_set(self, key: str, value: str, ttl: float) -> None:
+        self.client.set(self._cache_key(key), value, px=int(ttl * 1000))
+
+    def cache_delete(self, key: str) -> None:
+        self.client.delete(self._cache_key(key))
+
+
+def _coordinator():
+    if COORDINATION_URL.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCoordinator(providers.get("redis"))
+    return DatabaseCoordinator()
+
+
+providers.register("coordinator", _coordinator)
+
+
+def get_coordinator():
+    return providers.get("coordinator")
+
+
+@contextmanager
+def hold_lease(key: str, ttl: float = LEASE_TTL_SECONDS, owner: Optional[str] = None):
+    """lease 를 잡으면 True 를 yield 하고 ttl/3 마다 heartbeat. 못 잡으면 False."""
+    coord = get_coordinator()
+    # 같은 worker 의 다른 스레드도 별개 owner 여야 함 (acquire 는 같은 owner 의 재진입을 허용)
+    owner = owner or f"{worker_id()}:{uuid.uuid4().hex[:8]}"
+    if not coord.acquire(key, owner, ttl):
+        yield False
+        return
+
+    stop = threading.Event()
+
+    def _beat():
+        last_ok = time.monotonic()
+        while not stop.wait(ttl / 3):
+            try:
+                if not coord.renew(key, owner, ttl):
+                    print("lease lost:", key)
+                    return
+                last_ok = time.monotonic()
+            except Exception as e:
+                # 일시적 오류(database is locked, 연결 끊김)는 다음 주기에 재시도
+                print("lease renew error:", key, e)
+                if time.monotonic() - last_ok >= ttl:
+                    print("lease lost:", key)
+                    return
+
+    beater = threading.Thread(target=_beat, name=f"lease:{key}", daemon=True)
+    beater.start()
+    try:
+        yield True
+    finally:
+        stop.set()
+        beater.join()
+        coord.release(key, owner)
+
+
+def single_flight(
+    key: str,
+    fn: Callable[[], Any],
+    encode: Callable[[Any], str] = json.dumps,
+    decode: Callable[[str], Any] = json.loads,
+    result_ttl: float = SINGLE_FLIGHT_RESULT_TTL,
+    wait: float = SINGLE_FLIGHT_WAIT_SECONDS,
+) -> Any:
+    """같은 key 의 생성 호출을 모든 worker 를 통틀어 한 번만 실행하고 결과를 공유."""
+    coord = get_coordinator()
+    cache_key = f"sf:{key}"
+    deadline = time.monotonic() + wait
+    while True:
+        cached = coord.cache_get(cache_key)
+        if cached is not None:
+            return decode(cached)
+
+        with hold_lease(f"sf:{key}") as leader:
+            if leader:
+                # lease 를 잡는 사이에 다른 worker 가 끝냈을 수 있음
+                cached = coord.cache_get(cache_key)
+                if cached is not None:
+                    return decode(cached)
+                result = fn()
+                coord.cache_set(cache_key, encode(result), result_ttl)
+                return result
+
+        if time.monotonic() >= deadline:
+            # 리더가 너무 오래 걸리면 직접 실행
+            return fn()
+        time.sleep(_POLL_SECONDS)
+
+
+def cache_get_json(key: str) -> Optional[Any]:
+    value = get_coordinator().cache_get(key)
+    return json.loads(value) if value is not None else None
+
+
+def cache_set_json(key: str, value: Any, ttl: float) -> None:
+    get_coordinator().cache_set(key, json.dumps(value, ensure_ascii=False), ttl)
+
+
+def cache_delete(key: str) -> None:
+    get_coordinator().cache_delete(key)
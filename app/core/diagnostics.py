@@ -0,0 +1,133 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional
+
+# 이벤트 루프 stall 감시 + 샘플링 프로파일러
+# - async 핸들러 안의 blocking 호출(sync requests.post, 이미지 생성 루프 등)로 루프가 멈추면
+#   멈춘 순간의 루프 스레드 스택과 route 를 기록
+# - profile(): 지정 시간 동안 스레드 스택을 샘플링해서 collapsed stack 형식(flamegraph.pl / speedscope)으로 반환
+
+STALL_THRESHOLD_MS = float(os.getenv("STALL_THRESHOLD_MS", "250"))
+_TICK_SECONDS = 0.05
+_RECENT_STALLS = 50
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+
+
+def _route_of(frame) -> Optional[str]:
+    # 멈춘 스택을 거슬러 올라가며 ASGI scope 를 찾음
+    while frame is not None:
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") in ("http", "websocket"):
+            route = scope.get("route")
+            path = getattr(route, "path", None) or scope.get("path")
+            return f"{scope.get('method', '')} {path}".strip()
+        frame = frame.f_back
+    return None
+
+
+class LoopWatchdog:
+    def __init__(self, threshold_ms: float = STALL_THRESHOLD_MS):
+        self.threshold = threshold_ms / 1000
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self.last_tick = time.monotonic()
+        self.stalls: Deque[dict] = deque(maxlen=_RECENT_STALLS)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._handle = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self.threshold <= 0 or self._thread is not None:
+            return
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self.last_tick = time.monotonic()
+        self._stop.clear()
+        self._schedule_tick()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _schedule_tick(self) -> None:
+        if self._stop.is_set():
+            return
+        self.last_tick = time.monotonic()
+        self._handle = self.loop.call_later(_TICK_SECONDS, self._schedule_tick)
+
+    def _watch(self) -> None:
+        current: Optional[dict] = None
+        while not self._stop.wait(self.threshold / 2):
+            lag = time.monotonic() - self.last_tick - _TICK_SECONDS
+            if lag >= self.threshold:
+                if current is None:
+                    # 멈춘 상태에서 스택을 떠야 원인 호출이 보임
+                    frame = sys._current_frames().get(self.loop_thread_id)
+                    current = {
+                        "started_at": time.time() - lag,
+                        "route": _route_of(frame),
+                        "stack": "".join(traceback.format_stack(frame)) if frame else "",
+                    }
+                    print(
+                        f"[watchdog] event loop stalled {lag * 1000:.0f} ms "
+                        f"(route: {current['route'] or '-'})\n{current['stack']}"
+                    )
+            elif current is not None:
+                current["duration_ms"] = round((time.time() - current["started_at"]) * 1000)
+                print(f"[watchdog] event loop resumed after {current['duration_ms']} ms (route: {current['route'] or '-'})")
+                self.stalls.append(current)
+                current = None
+
+    def recent(self) -> List[dict]:
+        return list(self.stalls)
+
+
+watchdog = LoopWatchdog()
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def profile(seconds: float, interval_ms: float = 5.0, loop_only: bool = False) -> str:
+    """collapsed stack 형식: 'thread;outer;...;inner count' 한 줄씩."""
+    seconds = max(0.1, min(seconds, PROFILE_MAX_SECONDS))
+    interval = max(interval_ms, 1.0) / 1000
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("profile already running")
+    try:
+        me = threading.get_ident()
+        names: Dict[int, str] = {}
+        counts: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names.update({t.ident: t.name for t in threading.enumerate()})
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                if loop_only and tid != watchdog.loop_thread_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(tid, str(tid)))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+    finally:
+        _profile_lock.release()
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
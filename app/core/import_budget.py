@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# app.main import 시간 점검: python -m app.core.import_budget
+# 예산 초과나 무거운 SDK 가 import 시점에 올라오면 exit 1 (배포 전/CI 에서 실행)
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+TARGET_MODULE = os.getenv("IMPORT_BUDGET_TARGET", "app.main")
+
+# providers 레지스트리를 통해 첫 사용 시점에만 불러와야 하는 모듈
+DEFERRED_MODULES = (
+    "google.genai",
+    "authlib",
+    "requests",
+    "httpx",
+    "redis",
+)
+
+_DUMMY_ENV = {
+    "SECRET_KEY": "import-budget",
+    "NAVER_CLIENT_ID": "import-budget",
+    "NAVER_CLIENT_SECRET": "import-budget",
+}
+
+
+def profile_import(module: str = TARGET_MODULE) -> Dict[str, Tuple[int, int]]:
+    """-X importtime 결과를 {모듈: (self_us, cumulative_us)} 로 반환."""
+    env = dict(_DUMMY_ENV)
+    env.update(os.environ)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    timings: Dict[str, Tuple[int, int]] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].strip()
+        timings[name] = (int(parts[0]), int(parts[1]))
+    return timings
+
+
+def check(timings: Dict[str, Tuple[int, int]], module: str = TARGET_MODULE, budget_ms: float = IMPORT_BUDGET_MS) -> List[str]:
+    problems: List[str] = []
+
+    total_ms = timings.get(module, (0, 0))[1] / 1000
+    if total_ms > budget_ms:
+        problems.append(f"import {module}: {total_ms:.0f} ms > budget {budget_ms:.0f} ms")
+
+    for name in timings:
+        if any(name == m or name.startswith(m + ".") for m in DEFERRED_MODULES):
+            problems.append(f"{name} imported eagerly by {module}")
+    return problems
+
+
+def main():
+    timings = profile_import()
+    total_ms = timings.get(TARGET_MODULE, (0, 0))[1] / 1000
+    print(f"import {TARGET_MODULE}: {total_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    top = sorted(timings.items(), key=lambda kv: kv[1][0], reverse=True)[:15]
+    for name, (self_us, cum_us) in top:
+        print(f"  {self_us / 1000:8.1f} ms self {cum_us / 1000:8.1f} ms cum  {name}")
+
+    problems = check(timings)
+    for p in problems:
+        print("FAIL:", p)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
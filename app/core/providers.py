@@ -0,0 +1,105 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable
+
+# 외부 SDK 클라이언트를 프로세스당 한 번만, 처음 쓸 때 import/생성
+# (google.genai, authlib, requests, httpx 는 import 비용이 커서 app.main 로딩 시점에 부르지 않음)
+
+_factories: Dict[str, Callable[[], Any]] = {}
+_instances: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def register(name: str, factory: Callable[[], Any]) -> None:
+    _factories[name] = factory
+
+
+def get(name: str) -> Any:
+    inst = _instances.get(name)
+    if inst is not None:
+        return inst
+    with _lock:
+        inst = _instances.get(name)
+        if inst is None:
+            if name not in _factories:
+                raise KeyError(f"unknown provider: {name}")
+            inst = _factories[name]()
+            _instances[name] = inst
+    return inst
+
+
+def warm(names: Iterable[str] = ()) -> None:
+    for name in (names or list(_factories)):
+        try:
+            get(name)
+        except Exception as e:
+            # 키 미설정 등은 실제 호출 시점에 다시 에러가 나도록 둠
+            print(f"provider warm-up skipped ({name}):", e)
+
+
+async def aclose() -> None:
+    with _lock:
+        instances = dict(_instances)
+        _instances.clear()
+    for inst in instances.values():
+        close = getattr(inst, "aclose", None)
+        if close is not None:
+            await close()
+            continue
+        close = getattr(inst, "close", None)
+        if callable(close):
+            close()
+
+
+def _genai_client():
+    from google import genai
+
+    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY 또는 GOOGLE_API_KEY 환경변수를 설정하세요.")
+    return genai.Client(api_key=api_key)
+
+
+def _http_session():
+    import requests
+
+    return requests.Session()
+
+
+def _httpx_client():
+    import httpx
+
+    return httpx.AsyncClient(timeout=10.0)
+
+
+def _naver_oauth():
+    from authlib.integrations.starlette_client import OAuth
+
+    oauth = OAuth()
+    oauth.register(
+        name="naver",
+        client_id=os.environ["NAVER_CLIENT_ID"],
+        client_secret=os.environ["NAVER_CLIENT_SECRET"],
+        access_token_url="https://nid.naver.com/oauth2.0/token",
+        authorize_url="https://nid.naver.com/oauth2.0/authorize",
+        api_base_url="https://openapi.naver.com",
+        client_kwargs={"scope": "openid profile email"},
+    )
+    return oauth
+
+
+def _redis_client():
+    # COORDINATION_URL=redis://... 일 때만 사용 (redis 패키지는 그때만 필요)
+    import redis
+
+    url = os.getenv("COORDINATION_URL")
+    if not url:
+        raise RuntimeError("COORDINATION_URL not set")
+    return redis.Redis.from_url(url)
+
+
+register("genai", _genai_client)
+register("http", _http_session)
+register("httpx", _httpx_client)
+register("oauth", _naver_oauth)
+register("redis", _redis_client)
@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Hashable, List, Optional
+
+# 업스트림 생성 호출(Imagen, CLOVA) 공용 스케줄러
+# - 우선순위 클래스: interactive > regenerate > batch (엄격한 우선순위)
+# - 같은 클래스 안에서는 사용자별 가중 공정 큐잉 (virtual time 이 가장 작은 사용자부터)
+# - provider 별 동시 실행 수 / 분당 호출 수(RPM) 예산
+# - batch 는 BATCH_RESERVE 만큼 슬롯을 비워두고 남는 용량만 사용
+# - 예산은 프로세스 단위: worker N 개면 업스트림 기준 동시 실행/RPM 도 N 배가 되므로
+#   SCHED_*_CONCURRENCY / SCHED_*_RPM 은 (업스트림 한도 / worker 수) 로 설정
+
+INTERACTIVE = 0
+REGENERATE = 1
+BATCH = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", REGENERATE: "regenerate", BATCH: "batch"}
+
+BATCH_RESERVE = int(os.getenv("SCHED_BATCH_RESERVE", "1"))
+_WAIT_SAMPLES = 200
+
+
+class _Ticket:
+    __slots__ = ("provider", "user_id", "priority", "weight", "enqueued_at", "granted")
+
+    def __init__(self, provider: str, user_id: Hashable, priority: int, weight: float):
+        self.provider = provider
+        self.user_id = user_id
+        self.priority = priority
+        self.weight = weight
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class _Provider:
+    def __init__(self, name: str, concurrency: int, rpm: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.rpm = rpm
+        self.running = 0
+        self.starts: Deque[float] = deque()
+        # priority -> user_id -> FIFO
+        self.queues: Dict[int, Dict[Hashable, Deque[_Ticket]]] = {p: {} for p in PRIORITY_NAMES}
+        # 사용자별 마지막 finish tag / 마지막으로 배정된 start tag (시스템 virtual time)
+        self.vtime: Dict[Hashable, float] = {}
+        self.vnow = 0.0
+        self.waits: Dict[int, Deque[float]] = {p: deque(maxlen=_WAIT_SAMPLES) for p in PRIORITY_NAMES}
+        self.granted_total: Dict[int, int] = {p: 0 for p in PRIORITY_NAMES}
+
+    def rpm_wait(self, now: float) -> float:
+        # 0 이면 바로 시작 가능, 아니면 다음 슬롯까지 남은 초
+        if self.rpm <= 0:
+            return 0.0
+        while self.starts and now - self.starts[0] >= 60.0:
+            self.starts.popleft()
+        if len(self.starts) < self.rpm:
+            return 0.0
+        return 60.0 - (now - self.starts[0])
+
+    def start_tag(self, user_id: Hashable) -> float:
+        # 새로 들어온 사용자도 현재 virtual time 에서 시작 (쌓인 크레딧으로 독점하지 않도록)
+        return max(self.vtime.get(user_id, 0.0), self.vnow)
+
+    def queued(self, priority: int) -> int:
+        return sum(len(q) for q in self.queues[priority].values())
+
+
+class Scheduler:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._providers: Dict[str, _Provider] = {}
+
+    def configure(self, name: str, concurrency: int, rpm: int) -> None:
+        with self._cond:
+            prov = self._providers.get(name)
+            if prov is None:
+                self._providers[name] = _Provider(name, concurrency, rpm)
+            else:
+                prov.concurrency = max(1, concurrency)
+                prov.rpm = rpm
+                if rpm <= 0:
+                    prov.starts.clear()
+            self._dispatch_locked()
+
+    @contextmanager
+    def slot(
+        self,
+        provider: str,
+        user_id: Optional[Hashable] = None,
+        priority: int = INTERACTIVE,
+        weight: float = 1.0,
+    ):
+        """provider 슬롯을 배정받을 때까지 블록. 스레드(threadpool/백그라운드 작업)에서 사용."""
+        ticket = _Ticket(provider, user_id, priority, weight)
+        with self._cond:
+            prov = self._provider(provider)
+            prov.queues[priority].setdefault(user_id, deque()).append(ticket)
+            self._dispatch_locked()
+            while not ticket.granted:
+                self._cond.wait(timeout=self._next_wakeup_locked(prov))
+                self._dispatch_locked()
+            prov.waits[priority].append(time.monotonic() - ticket.enqueued_at)
+        try:
+            yield
+        finally:
+            with self._cond:
+                prov.running -= 1
+                self._dispatch_locked()
+
+    def stats(self) -> Dict[str, dict]:
+        out: Dict[str, dict] = {}
+        with self._cond:
+            now = time.monotonic()
+            for name, prov in self._providers.items():
+                prov.rpm_wait(now)
+                classes = {}
+                for p, label in PRIORITY_NAMES.items():
+                    waits = sorted(prov.waits[p])
+                    classes[label] = {
+                        "queued": prov.queued(p),
+                        "granted": prov.granted_total[p],
+                        "wait_avg_ms": round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+                        "wait_p95_ms": round(1000 * waits[round(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+                    }
+                out[name] = {
+                    "running": prov.running,
+                    "concurrency": prov.concurrency,
+                    "rpm": prov.rpm,
+                    "rpm_used": len(prov.starts),
+                    "classes": classes,
+                }
+        return out
+
+    def _provider(self, name: str) -> _Provider:
+        prov = self._providers.get(name)
+        if prov is None:
+            prov = self._providers[name] = _Provider(name, 1, 0)
+        return prov
+
+    def _next_wakeup_locked(self, prov: _Provider) -> Optional[float]:
+        wait = prov.rpm_wait(time.monotonic())
+        return max(wait, 0.01) if wait else None
+
+    def _pick_locked(self, prov: _Provider) -> Optional[_Ticket]:
+        batch_limit = prov.concurrency - min(BATCH_RESERVE, prov.concurrency - 1)
+        for p in sorted(prov.queues):
+            if p == BATCH and prov.running >= batch_limit:
+                # interactive 용 여유 슬롯은 batch 에 내주지 않음
+                return None
+            users: List[Hashable] = [u for u, q in prov.queues[p].items() if q]
+            if not users:
+                continue
+            user = min(users, key=prov.start_tag)
+            queue = prov.queues[p][user]
+            ticket = queue.popleft()
+            if not queue:
+                del prov.queues[p][user]
+            return ticket
+        return None
+
+    def _dispatch_locked(self) -> None:
+        granted = False
+        now = time.monotonic()
+        for prov in self._providers.values():
+            while prov.running < prov.concurrency and prov.rpm_wait(now) == 0.0:
+                ticket = self._pick_locked(prov)
+                if ticket is None:
+                    break
+                # 고를 때와 같은 start tag 로 과금
+                start = prov.start_tag(ticket.user_id)
+                prov.vnow = start
+                prov.vtime[ticket.user_id] = start + 1.0 / max(ticket.weight, 1e-6)
+                ticket.granted = True
+                prov.running += 1
+                if prov.rpm > 0:
+                    # RPM 무제한이면 시작 시각을 쌓지 않음 (정리하는 곳이 없어 계속 늘어남)
+                    prov.starts.append(now)
+                prov.granted_total[ticket.priority] += 1
+                granted = True
+            # 대기열이 빈 사용자의 virtual time 은 정리
+            waiting = {u for p in prov.queues for u in prov.queues[p]}
+            if not waiting:
+                prov.vtime.clear()
+                prov.vnow = 0.0
+        if granted:
+            self._cond.notify_all()
+
+
+scheduler = Scheduler()
+scheduler.configure(
+    "imagen",
+    concurrency=int(os.getenv("SCHED_IMAGEN_CONCURRENCY", "4")),
+    rpm=int(os.getenv("SCHED_IMAGEN_RPM", "20")),
+)
+scheduler.configure(
+    "clova",
+    concurrency=int(os.getenv("SCHED_CLOVA_CONCURRENCY", "4")),
+    rpm=int(os.getenv("SCHED_CLOVA_RPM", "60")),
+)
@@ -1,49 +1,90 @@
-from fastapi import FastAPI, Request, Depends, Body
-from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse
+from fastapi import FastAPI, Request, Depends, Body, Query, BackgroundTasks
+from fastapi.responses import RedirectResponse, JSONResponse, FileResponse, PlainTextResponse, HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
-from authlib.integrations.starlette_client import OAuth
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core import providers
+from app.core.scheduler import scheduler, INTERACTIVE
+from app.core import diagnostics
 from app.models.user_model import User
+from app.models.story_model import Story, StoryImage
 from app.schemas.user_schemas import UserUpdateSchema
 from app.schemas.story_schemas import (
     StoryCreate,
-    StoryLoad,
     StoryImageOut,
     StoryMakeResponse,
     StoryData,       # StoryData에 moral: bool = True 필드가 있어야 함 (아래 노트 참고)
+    StorySearchResponse,
+)
+from app.services.story_service import create_story, PROGRESSIVE_AVAILABLE
+from app.services.search_service import search_stories
+from app.services.viewer_service import load_story_view
+from app.services.clova_service import make_story_text_shared
+from app.services.tts_service import TTSError, prune_tts_cache, synthesize_cached
+from app.services.job_service import (
+    JOB_POLL_SECONDS,
+    render_job_key,
+    run_job_inline,
+    run_next_job,
+)
+from app.services.draft_service import (
+    claim_draft,
+    expire_stale_drafts,
+    speculate_for_user,
+    take_draft_image,
+)
+from app.services.storage_service import (
+    StorageQuotaExceeded,
+    ensure_quota,
+    reap_once,
+    GC_INTERVAL_SECONDS,
 )
-from app.services.story_service import create_story, create_images_for_story
 
 import os
-import httpx
-import requests
-import io
-import uuid
+from typing import List
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 
 
 load_dotenv()
 
-app = FastAPI()
+
+# 기동 시 미리 만들 클라이언트. coordinator 는 COORDINATION_URL 이 redis 일 때만 redis 를 import
+WARM_PROVIDERS = ("genai", "http", "httpx", "oauth", "coordinator")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # SDK 클라이언트 워밍은 기동을 막지 않도록 백그라운드에서
+    warmup = asyncio.create_task(run_in_threadpool(providers.warm, WARM_PROVIDERS))
+    # async 핸들러 안의 blocking 호출로 루프가 멈추면 스택/route 를 로그로 남김
+    diagnostics.watchdog.start(asyncio.get_running_loop())
+    reaper = None
+    if GC_INTERVAL_SECONDS > 0:
+        reaper = asyncio.create_task(_storage_reaper_loop())
+    app.state.storage_reaper = reaper
+    # 다른 worker 가 남긴 작업(lease 만료)과 final 렌더 작업 처리
+    job_workers = [asyncio.create_task(_job_worker_loop()) for _ in range(JOB_WORKERS)]
+    try:
+        yield
+    finally:
+        for task in (reaper, warmup, *job_workers):
+            if task is not None:
+                task.cancel()
+        diagnostics.watchdog.stop()
+        await providers.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(SessionMiddleware, secret_key=os.environ["SECRET_KEY"])
 
 templates = Jinja2Templates(directory="templates")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-oauth = OAuth()
-oauth.register(
-    name="naver",
-    client_id=os.environ["NAVER_CLIENT_ID"],
-    client_secret=os.environ["NAVER_CLIENT_SECRET"],
-    access_token_url="https://nid.naver.com/oauth2.0/token",
-    authorize_url="https://nid.naver.com/oauth2.0/authorize",
-    api_base_url="https://openapi.naver.com",
-    client_kwargs={"scope": "openid profile email"},
-)
-
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -66,16 +107,47 @@ app.add_middleware(
 def get_current_user(request: Request):
     return request.session.get("user")
 
+
+# 운영용 엔드포인트(/debug/*) 접근 허용 네이버 id (콤마 구분)
+ADMIN_NAVER_IDS = {i.strip() for i in os.getenv("ADMIN_NAVER_IDS", "").split(",") if i.strip()}
+
+
+def is_admin(user: dict | None) -> bool:
+    return bool(user) and user.get("naver_id") in ADMIN_NAVER_IDS
+
+
+# ---------- Storage GC ----------
+async def _storage_reaper_loop():
+    while True:
+        try:
+            await run_in_threadpool(reap_once)
+            await run_in_threadpool(expire_stale_drafts)
+            await run_in_threadpool(prune_tts_cache)
+        except Exception as e:
+            print("storage reaper error:", e)
+        await asyncio.sleep(GC_INTERVAL_SECONDS)
+
+
+# ---------- Jobs ----------
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+
+async def _job_worker_loop():
+    while True:
+        try:
+            ran = await run_in_threadpool(run_next_job)
+        except Exception as e:
+            print("job worker error:", e)
+            ran = False
+        if not ran:
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
 # ---------- CLOVA (Text LLM) ----------
 CLOVA_API_KEY    = os.getenv("CLOVA_API_KEY")
 CLOVA_REQUEST_ID = os.getenv("CLOVA_REQUEST_ID")
 CLOVA_MODEL      = os.getenv("CLOVA_MODEL", "HCX-005")
 CLOVA_ENDPOINT   = f"https://clovastudio.stream.ntruss.com/testapp/v3/chat-completions/{CLOVA_MODEL}"
 
-# ---------- NAVER TTS ----------
-TTS_API_URL       = "https://naveropenapi.apigw.ntruss.com/tts-premium/v1/tts"
-TTS_CLIENT_ID     = os.getenv("NAVER_CLIENT_ID")
-TTS_CLIENT_SECRET = os.getenv("NAVER_CLIENT_SECRET")
 
 
 @app.get("/")
@@ -88,19 +160,21 @@ async def home(request: Request, user: dict | None = Depends(get_current_user)):
 @app.get("/login/naver")
 async def login_naver(request: Request):
     redirect_uri = f"{BASE_URL}/auth/naver/callback"
+    oauth = providers.get("oauth")
     return await oauth.naver.authorize_redirect(request, redirect_uri)
 
 
 @app.get("/auth/naver/callback")
 async def auth_naver_callback(request: Request, db: Session = Depends(get_db)):
+    oauth = providers.get("oauth")
     token = await oauth.naver.authorize_access_token(request)
 
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            "https://openapi.naver.com/v1/nid/me",
-            headers={"Authorization": f'Bearer {token["access_token"]}'},
-            timeout=10.0,
-        )
+    client = providers.get("httpx")
+    r = await client.get(
+        "https://openapi.naver.com/v1/nid/me",
+        headers={"Authorization": f'Bearer {token["access_token"]}'},
+        timeout=10.0,
+    )
     data = r.json()
     resp = (data or {}).get("response", {})
 
@@ -127,10 +201,11 @@ async def logout(request: Request):
 
 
 @app.get("/profile")
-async def profile(request: Request, user: dict | None = Depends(get_current_user)):
+async def profile(request: Request, user: dict | None = Depends(get_current_user), db: Session = Depends(get_db)):
     if not user:
         return RedirectResponse("/login/naver", status_code=303)
-    return templates.TemplateResponse("profile.html", {"request": request, "user": user})
+    profile_row = db.query(User).filter(User.id == user["id"]).first()
+    return templates.TemplateResponse("profile.html", {"request": request, "user": user, "profile": profile_row})
 
 
 @app.post("/profile/update")
@@ -156,9 +231,10 @@ def profile_update(
 
 
 @app.get("/story")
-def make_story(request: Request, user: dict | None = Depends(get_current_user)):
+def make_story(request: Request, background_tasks: BackgroundTasks, user: dict | None = Depends(get_current_user)):
     if not user:
         return RedirectResponse("/login/naver", status_code=303)
+    background_tasks.add_task(speculate_for_user, user["id"])
     return templates.TemplateResponse("story.html", {"request": request, "user": user})
 
 
@@ -166,100 +242,113 @@ def make_story(request: Request, user: dict | None = Depends(get_current_user)):
 async def create_story_process(
     request: Request,
     payload: StoryCreate = Body(...),
+    progressive: bool = Query(False),
     db: Session = Depends(get_db),
 ):
     user = get_current_user(request)
     if not user:
         return JSONResponse({"detail": "login required"}, status_code=401)
 
+    try:
+        ensure_quota(db, user["id"])
+    except StorageQuotaExceeded as e:
+        return JSONResponse(
+            {"detail": "storage quota exceeded", "used": e.used, "quota": e.quota},
+            status_code=403,
+        )
+
     row = create_story(db, payload, user["id"])
 
-    story_load = StoryLoad(id=row.id, title=payload.title, paragraphs=payload.paragraphs)
-    results = create_images_for_story(db, story_load)
-    images_out = [StoryImageOut(idx=r.idx, file_path=r.file_path, prompt=r.prompt) for r in (results or [])]
+    pre_rendered = {}
+    if payload.draft_id:
+        path = take_draft_image(db, payload.draft_id, user["id"], payload)
+        if path:
+            pre_rendered[1] = path
+
+    # 렌더링을 이 worker 가 lease 를 쥔 실행 중 작업으로 등록하고 바로 실행
+    # (백그라운드 job 루프가 먼저 가져가지 않음. 도중에 죽으면 다른 worker 가 남은 장면부터 이어서 그림,
+    #  draft 는 final 작업으로 이어짐)
+    # 이미지 생성은 수십 초 걸리므로 이벤트 루프 밖에서
+    await run_in_threadpool(run_job_inline, "render_story", render_job_key(row.id), {
+        "story_id": row.id,
+        "progressive": progressive,
+        "pre_rendered": pre_rendered,
+    })
+
+    db.expire_all()
+    rows = db.query(StoryImage).filter(StoryImage.story_id == row.id).order_by(StoryImage.idx).all()
+    images_out = [StoryImageOut(idx=r.idx, file_path=r.file_path, prompt="", tier=r.tier) for r in rows]
 
     return StoryMakeResponse(story_id=row.id, title=payload.title, images=images_out)
 
 
+@app.get("/stories/{story_id}/images", response_model=List[StoryImageOut])
+def story_images(story_id: int, request: Request, db: Session = Depends(get_db)):
+    user = get_current_user(request)
+    if not user:
+        return JSONResponse({"detail": "login required"}, status_code=401)
 
-CLOVA_HOST  = os.getenv("CLOVA_HOST", "https://clovastudio.apigw.ntruss.com")
-CLOVA_MODEL = os.getenv("CLOVA_MODEL", "HCX-003")  # 사용 중인 모델명으로 교체 가능
-CLOVA_KEY   = os.getenv("CLOVA_API_KEY")           # 'nv-'로 시작 권장
+    story = db.query(Story).filter(Story.id == story_id, Story.user_id == user["id"]).first()
+    if not story:
+        return JSONResponse({"detail": "not found"}, status_code=404)
 
-@app.post("/clova/make", response_model=StoryCreate)
-def clova_make(payload: StoryData = Body(...)):
-    title = (payload.title or "").strip() or "아이를 위한 짧은 동화"
-    hero  = (payload.hero  or "").strip() or "아이"
-    _age = None
-    if payload.age is not None:
-        try:
-            _age = int(str(payload.age).strip())
-        except ValueError:
-            _age = None
-    age = str(_age or "")
-    theme = (payload.theme or "").strip()
-    extra = (payload.extra or "").strip()
-
-    # CLOVA X 프롬프트
-    system = (
-        "너는 유아용 동화 작가야. 3~5개의 장면으로 나누고, 각 장면은 2~3문장으로 간결하게 써줘. "
-        "title과 paragraphs[{title,text}] 형태의 JSON만 반환해."
-    )
-    user_prompt = f"""동화 제목: {title}
-주인공: {hero} (나이: {age or '미상'})
-주제/분위기: {theme or '따뜻하고 용기있는 모험'}
-추가지시: {extra or '각 장면은 2~3문장, 유아어휘'}"""
-
-    # CLOVA X 요청 본문 (컨벤션에 맞게 조정)
-    body = {
-        "messages": [
-            {"role":"system", "content": system},
-            {"role":"user", "content": user_prompt},
-        ],
-        "maxTokens": 600,
-        "temperature": 0.6,
-        "topP": 0.8,
-    }
+    rows = db.query(StoryImage).filter(StoryImage.story_id == story_id).order_by(StoryImage.idx).all()
+    return [StoryImageOut(idx=r.idx, file_path=r.file_path, prompt="", tier=r.tier) for r in rows]
 
-    headers = {
-        "X-NCP-CLOVASTUDIO-API-KEY": CLOVA_KEY or "",
-        "X-NCP-CLOVASTUDIO-REQUEST-ID": str(uuid.uuid4()),
-        "Content-Type": "application/json; charset=utf-8",
-        "Accept": "application/json",
-    }
 
-    try:
-        if not CLOVA_KEY:
-            raise RuntimeError("CLOVA_API_KEY not set")
-
-        # 엔드포인트는 실제 콘솔 문서에 맞춰 조정하세요.
-        url = f"{CLOVA_HOST}/v3/chat-completions/{CLOVA_MODEL}"
-        res = requests.post(url, headers=headers, json=body, timeout=30)
-        res.raise_for_status()
-        data = res.json()
-
-        # 모델 응답에서 JSON만 추출 (콘솔 응답 구조에 맞게 파싱부 조정 가능)
-        text = data.get("result", {}).get("message", "") or data.get("output","")
-        # 혹시 모델이 가끔 코드블록으로 줄 때 대비
-        import re, json as _json
-        m = re.search(r"\{.*\}", text, flags=re.S)
-        if m:
-            obj = _json.loads(m.group(0))
-            title = obj.get("title") or title
-            paragraphs = obj.get("paragraphs") or []
-        else:
-            # 파싱 실패 시 간단히 분해
-            paragraphs = [{"title": "장면 1", "text": text.strip()}]
-
-    except Exception:
-        # 실패 fallback : 간단한 3문단
-        paragraphs = [
-            {"title": "시작",   "text": f"{hero}는 {theme or '따뜻한 모험'}을(를) 시작했어요."},
-            {"title": "도전",   "text": f"새로운 친구들과 함께 어려움을 이겨냈어요."},
-            {"title": "마무리", "text": f"모두가 웃으며 집으로 돌아왔답니다."},
-        ]
-
-    return StoryCreate(title=title, paragraphs=paragraphs)
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+@app.get("/stories/{story_id}/view", response_class=HTMLResponse)
+def story_view(story_id: int, request: Request, db: Session = Depends(get_db)):
+    user = get_current_user(request)
+    if not user:
+        return RedirectResponse("/login/naver", status_code=303)
+
+    view = load_story_view(db, story_id, user["id"])
+    if view is None:
+        return JSONResponse({"detail": "not found"}, status_code=404)
+
+    # 내용이 그대로면 본문 없이 304 (no-cache: 매번 재검증)
+    etag = f'"{view.version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if view.preload:
+        headers["Link"] = ", ".join(f"<{src}>; rel=preload; as=image" for src in view.preload)
+    return HTMLResponse(view.html(), headers=headers)
+
+
+@app.get("/stories/search", response_model=StorySearchResponse)
+def stories_search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    user = get_current_user(request)
+    if not user:
+        return JSONResponse({"detail": "login required"}, status_code=401)
+
+    total, hits = search_stories(db, user["id"], q, limit=limit, offset=offset)
+    return StorySearchResponse(query=q, total=total, hits=hits)
+
+
+
+@app.post("/clova/make", response_model=StoryCreate)
+def clova_make(request: Request, payload: StoryData = Body(...), db: Session = Depends(get_db)):
+    user = get_current_user(request)
+    if user:
+        # 페이지 진입 때 미리 만들어 둔 초안이 있으면 바로 사용
+        drafted = claim_draft(db, user["id"], payload)
+        if drafted:
+            return drafted
+    return make_story_text_shared(payload, user_id=(user or {}).get("id"), priority=INTERACTIVE)
 
 
 @app.post("/tts")
@@ -274,26 +363,59 @@ async def tts(req: Request):
     if len(text) > 3000:
         text = text[:3000]
 
-    headers = {
-        "X-NCP-APIGW-API-KEY-ID": TTS_CLIENT_ID,
-        "X-NCP-APIGW-API-KEY":    TTS_CLIENT_SECRET,
-    }
-    data = {
-        "speaker": speaker,
-        "speed":   speed,
-        "text":    text,
-        # "format": "mp3",
-    }
+    try:
+        path = await run_in_threadpool(synthesize_cached, text, speaker, speed)
+    except TTSError as e:
+        return JSONResponse({"error": f"TTS 호출 실패: {e}", "raw": e.raw}, status_code=500)
+    return FileResponse(path, media_type="audio/mpeg")
+
+
+@app.get("/scheduler/stats")
+def scheduler_stats(request: Request):
+    # 전체 사용자의 대기열 정보라 운영자만
+    if not is_admin(get_current_user(request)):
+        return JSONResponse({"detail": "forbidden"}, status_code=403)
+    return scheduler.stats()
 
+
+@app.get("/debug/stalls")
+def debug_stalls(request: Request):
+    if not is_admin(get_current_user(request)):
+        return JSONResponse({"detail": "forbidden"}, status_code=403)
+    return {"threshold_ms": diagnostics.STALL_THRESHOLD_MS, "stalls": diagnostics.watchdog.recent()}
+
+
+@app.get("/debug/profile")
+async def debug_profile(
+    request: Request,
+    seconds: float = Query(5.0, gt=0, le=diagnostics.PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    loop_only: bool = Query(False),
+):
+    # collapsed stack 텍스트 -> flamegraph.pl / speedscope 에 그대로 넣으면 됨
+    if not is_admin(get_current_user(request)):
+        return JSONResponse({"detail": "forbidden"}, status_code=403)
     try:
-        r = requests.post(TTS_API_URL, headers=headers, data=data, timeout=30)
-        r.raise_for_status()
-        return StreamingResponse(io.BytesIO(r.content), media_type="audio/mpeg")
-    except Exception as e:
-        err_text = getattr(r, "text", "")
-        return JSONResponse({"error": f"TTS 호출 실패: {e}", "raw": err_text}, status_code=500)
+        folded = await run_in_threadpool(diagnostics.profile, seconds, interval_ms, loop_only)
+    except RuntimeError as e:
+        return JSONResponse({"detail": str(e)}, status_code=409)
+    return PlainTextResponse(folded)
 
 
 @app.get("/make/storybook")
-async def tts_ui(request: Request, user: dict | None = Depends(get_current_user)):
-    return templates.TemplateResponse("storybook.html", {"request": request, "user": user})
+async def tts_ui(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    user: dict | None = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    profile_row = None
+    if user:
+        profile_row = db.query(User).filter(User.id == user["id"]).first()
+        background_tasks.add_task(speculate_for_user, user["id"])
+    return templates.TemplateResponse("storybook.html", {
+        "request": request,
+        "user": user,
+        "profile": profile_row,
+        "progressive_available": PROGRESSIVE_AVAILABLE,
+    })
@@ -1,2 +1,4 @@
 from .user_model import User
-from .story_model import Story, StoryImage
\ No newline at end of file
+from .story_model import Story, StoryImage, PromptTemplate
+from .draft_model import StoryDraft
+from .coordination_model import CoordLease, CoordCache, Job
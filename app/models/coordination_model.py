@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, Text, Float
+from app.core.database import Base
+
+# 여러 worker/노드가 공유하는 조정용 테이블 (app.core.coordination, app.services.job_service)
+
+class CoordLease(Base):
+    __tablename__ = "coord_leases"
+
+    key = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    # epoch seconds
+    expires_at = Column(Float, nullable=False)
+
+class CoordCache(Base):
+    __tablename__ = "coord_cache"
+
+    key = Column(String, primary_key=True)
+    value = Column(Text, nullable=False)
+    expires_at = Column(Float, nullable=False, index=True)
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)
+    # 같은 작업이 중복으로 쌓이지 않게 하는 키 (예: "story:12:render")
+    key = Column(String, nullable=False, unique=True)
+    payload = Column(Text, nullable=False, default="{}")
+    # queued → running → done / failed
+    status = Column(String, nullable=False, default="queued", index=True)
+    owner = Column(String, nullable=True)
+    lease_expires_at = Column(Float, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+class StoryDraft(Base):
+    __tablename__ = "story_drafts"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), index=True, nullable=False)
+
+    # clova_service.normalize_story_data 기준 요청 해시 (title 제외)
+    key = Column(String, index=True, nullable=False)
+    # pending → ready → claimed / expired / failed
+    status = Column(String, nullable=False, default="pending")
+    title = Column(String, nullable=True)
+    content = Column(Text, nullable=True)
+    image_path = Column(String, nullable=True)
+
+    # epoch seconds
+    created_at = Column(Integer, nullable=False)
+    expires_at = Column(Integer, nullable=False)
+
+    user = relationship("User", passive_deletes=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -23,12 +23,28 @@ class Story(Base):
 
 class StoryImage(Base):
     __tablename__ = "story_images"
+    # 렌더 작업이 두 worker 에서 겹쳐도 장면은 하나만
+    __table_args__ = (UniqueConstraint("story_id", "idx", name="uq_story_images_story_id_idx"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     story_id = Column(Integer, ForeignKey("stories.id", ondelete="CASCADE"), index=True, nullable=False)
     idx = Column(Integer, nullable=False)
-    prompt = Column(String, nullable=False)
+    # 압축 전 행만 전체 프롬프트를 가짐. 새 행은 템플릿 id + 장면 파라미터(JSON)로 저장
+    prompt = Column(String, nullable=True)
+    prompt_template_id = Column(Integer, ForeignKey("prompt_templates.id"), nullable=True)
+    prompt_params = Column(Text, nullable=True)
     file_path = Column(String, nullable=False)
     mime_type = Column(String, nullable=False, default="image/png")
+    size_bytes = Column(Integer, nullable=False, default=0, server_default="0")
+    # "draft" (빠른 모델) → "final" (GEMINI_IMAGE_MODEL)
+    tier = Column(String, nullable=False, default="final", server_default="final")
 
     story = relationship("Story", back_populates="images")
+    prompt_template = relationship("PromptTemplate")
+
+class PromptTemplate(Base):
+    __tablename__ = "prompt_templates"
+
+    # id 가 곧 템플릿 버전
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    body = Column(Text, nullable=False)
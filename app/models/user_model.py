@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -11,6 +11,9 @@ class User(Base):
     child_age = Column(Integer, nullable=True)
     child_pers = Column(String, nullable=True)
     child_gender = Column(String, nullable=True)
+    storage_bytes = Column(Integer, nullable=False, default=0, server_default="0")
+    # 페이지 진입 시 프로필로 동화 초안을 미리 생성 (opt-in)
+    speculate = Column(Boolean, nullable=False, default=False, server_default="0")
 
     stories = relationship(
         "Story",
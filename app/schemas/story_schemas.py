@@ -8,6 +8,8 @@ class StoryParagraph(BaseModel):
 class StoryCreate(BaseModel):
     title: str
     paragraphs: List[StoryParagraph]
+    # /clova/make 가 speculative draft 를 사용했을 때만 채워짐
+    draft_id: Optional[int] = None
 
 class StoryLoad(BaseModel):
     id: int
@@ -18,6 +20,7 @@ class StoryImageOut(BaseModel):
     idx: int
     file_path: str
     prompt: str
+    tier: str = "final"
 
 class StoryMakeResponse(BaseModel):
     story_id: int
@@ -31,3 +34,16 @@ class StoryData(BaseModel):
     age: Optional[Union[int, str]] = None
     theme: Optional[str] = None
     extra: Optional[str] = None
+
+# /stories/search 응답
+class StorySearchHit(BaseModel):
+    story_id: int
+    title: str
+    # HTML escape 된 본문 + 일치 구간만 <mark>
+    snippet: str
+    rank: float
+
+class StorySearchResponse(BaseModel):
+    query: str
+    total: int
+    hits: List[StorySearchHit] = []
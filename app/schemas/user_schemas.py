@@ -8,3 +8,4 @@ class UserUpdateSchema(BaseModel):
     child_age: Optional[int] = None
     child_pers: Optional[str] = None
     child_gender: Optional[str] = None
+    speculate: Optional[bool] = None
@@ -0,0 +1,145 @@
+import os
+import re
+import json
+import uuid
+import hashlib
+from typing import Optional
+from dotenv import load_dotenv, find_dotenv
+from app.core import providers
+from app.core.coordination import single_flight
+from app.core.scheduler import scheduler, INTERACTIVE
+from app.schemas.story_schemas import StoryCreate, StoryData
+
+load_dotenv(find_dotenv(), override=False)
+
+CLOVA_HOST  = os.getenv("CLOVA_HOST", "https://clovastudio.apigw.ntruss.com")
+CLOVA_MODEL = os.getenv("CLOVA_MODEL", "HCX-003")  # 사용 중인 모델명으로 교체 가능
+CLOVA_KEY   = os.getenv("CLOVA_API_KEY")           # 'nv-'로 시작 권장
+
+DEFAULT_TITLE = "아이를 위한 짧은 동화"
+DEFAULT_HERO = "아이"
+
+# single-flight 결과 보관 시간: 진행 중이던 호출을 기다린 요청이 가져갈 만큼만
+CLOVA_SHARE_TTL_SECONDS = float(os.getenv("CLOVA_SHARE_TTL", "2"))
+
+
+def normalize_story_data(payload: StoryData) -> dict:
+    # CLOVA 에 실제로 전달되는 값 기준으로 정규화 (speculative draft 매칭에도 사용)
+    _age = None
+    if payload.age is not None:
+        try:
+            _age = int(str(payload.age).strip())
+        except ValueError:
+            _age = None
+    return {
+        "title": (payload.title or "").strip() or DEFAULT_TITLE,
+        "hero": (payload.hero or "").strip() or DEFAULT_HERO,
+        "age": str(_age or ""),
+        "theme": (payload.theme or "").strip(),
+        "extra": (payload.extra or "").strip(),
+    }
+
+
+def make_story_text(
+    payload: StoryData,
+    user_id: Optional[int] = None,
+    priority: int = INTERACTIVE,
+    fallback: bool = True,
+) -> StoryCreate:
+    data = normalize_story_data(payload)
+    title = data["title"]
+    hero = data["hero"]
+    age = data["age"]
+    theme = data["theme"]
+    extra = data["extra"]
+
+    # CLOVA X 프롬프트
+    system = (
+        "너는 유아용 동화 작가야. 3~5개의 장면으로 나누고, 각 장면은 2~3문장으로 간결하게 써줘. "
+        "title과 paragraphs[{title,text}] 형태의 JSON만 반환해."
+    )
+    user_prompt = f"""동화 제목: {title}
+주인공: {hero} (나이: {age or '미상'})
+주제/분위기: {theme or '따뜻하고 용기있는 모험'}
+추가지시: {extra or '각 장면은 2~3문장, 유아어휘'}"""
+
+    # CLOVA X 요청 본문 (컨벤션에 맞게 조정)
+    body = {
+        "messages": [
+            {"role":"system", "content": system},
+            {"role":"user", "content": user_prompt},
+        ],
+        "maxTokens": 600,
+        "temperature": 0.6,
+        "topP": 0.8,
+    }
+
+    headers = {
+        "X-NCP-CLOVASTUDIO-API-KEY": CLOVA_KEY or "",
+        "X-NCP-CLOVASTUDIO-REQUEST-ID": str(uuid.uuid4()),
+        "Content-Type": "application/json; charset=utf-8",
+        "Accept": "application/json",
+    }
+
+    try:
+        if not CLOVA_KEY:
+            raise RuntimeError("CLOVA_API_KEY not set")
+
+        # 엔드포인트는 실제 콘솔 문서에 맞춰 조정하세요.
+        url = f"{CLOVA_HOST}/v3/chat-completions/{CLOVA_MODEL}"
+        with scheduler.slot("clova", user_id=user_id, priority=priority):
+            res = providers.get("http").post(url, headers=headers, json=body, timeout=30)
+        res.raise_for_status()
+        data = res.json()
+
+        # 모델 응답에서 JSON만 추출 (콘솔 응답 구조에 맞게 파싱부 조정 가능)
+        text = data.get("result", {}).get("message", "") or data.get("output","")
+        # 혹시 모델이 가끔 코드블록으로 줄 때 대비
+        m = re.search(r"\{.*\}", text, flags=re.S)
+        if m:
+            obj = json.loads(m.group(0))
+            title = obj.get("title") or title
+            paragraphs = obj.get("paragraphs") or []
+        else:
+            # 파싱 실패 시 간단히 분해
+            paragraphs = [{"title": "장면 1", "text": text.strip()}]
+
+    except Exception:
+        if not fallback:
+            raise
+        return fallback_story(payload)
+
+    return StoryCreate(title=title, paragraphs=paragraphs)
+
+
+def fallback_story(payload: StoryData) -> StoryCreate:
+    # 실패 fallback : 간단한 3문단
+    data = normalize_story_data(payload)
+    hero, theme = data["hero"], data["theme"]
+    paragraphs = [
+        {"title": "시작",   "text": f"{hero}는 {theme or '따뜻한 모험'}을(를) 시작했어요."},
+        {"title": "도전",   "text": f"새로운 친구들과 함께 어려움을 이겨냈어요."},
+        {"title": "마무리", "text": f"모두가 웃으며 집으로 돌아왔답니다."},
+    ]
+    return StoryCreate(title=data["title"], paragraphs=paragraphs)
+
+
+def make_story_text_shared(payload: StoryData, user_id: Optional[int] = None, priority: int = INTERACTIVE) -> StoryCreate:
+    # 같은 사용자의 같은 입력이 동시에 들어오면(중복 클릭, 여러 탭) 모든 worker 를 통틀어 CLOVA 를 한 번만 호출
+    # - 결과는 기다리던 요청이 가져갈 동안만 남김: 나중에 다시 누르면 새 이야기를 받아야 함
+    # - fallback 이야기는 공유하지 않음
+    # - 비로그인 요청은 누구의 요청인지 구분할 수 없으므로 공유하지 않음
+    if user_id is None:
+        return make_story_text(payload, user_id=None, priority=priority)
+    raw = json.dumps(normalize_story_data(payload), ensure_ascii=False, sort_keys=True)
+    key = f"clova:{user_id}:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    try:
+        result = single_flight(
+            key,
+            lambda: make_story_text(payload, user_id=user_id, priority=priority, fallback=False).dict(),
+            result_ttl=CLOVA_SHARE_TTL_SECONDS,
+        )
+    except Exception as e:
+        print("CLOVA call failed, using fallback story:", e)
+        return fallback_story(payload)
+    return StoryCreate(**result)
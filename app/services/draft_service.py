@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import hashlib
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.core.scheduler import BATCH
+from app.models.draft_model import StoryDraft
+from app.models.user_model import User
+from app.schemas.story_schemas import StoryCreate, StoryData, StoryParagraph
+from app.services.clova_service import make_story_text, normalize_story_data
+from app.services.story_service import render_scene_image
+
+# 프로필 기반 speculative 동화 초안
+# - /story, /make/storybook 진입 시 백그라운드로 CLOVA 초안(+옵션: 첫 장면 이미지)을 batch 우선순위로 생성
+# - 같은 입력으로 /clova/make 가 오면 초안을 바로 돌려줌
+# - 사용자별 일일 생성 수 제한, TTL 지나면 폐기
+
+SPECULATIVE_ENABLED = os.getenv("SPECULATIVE_ENABLED", "1") == "1"
+SPECULATIVE_IMAGE = os.getenv("SPECULATIVE_IMAGE", "0") == "1"
+SPECULATIVE_TTL_SECONDS = int(os.getenv("SPECULATIVE_TTL", "900"))
+SPECULATIVE_DAILY_CAP = int(os.getenv("SPECULATIVE_DAILY_CAP", "5"))
+# 아직 생성 중인 초안을 /clova/make 가 기다리는 최대 시간
+SPECULATIVE_CLAIM_WAIT = float(os.getenv("SPECULATIVE_CLAIM_WAIT", "20"))
+
+DRAFTS_DIR = os.path.join("static", "drafts")
+
+PENDING = "pending"
+READY = "ready"
+CLAIMED = "claimed"
+EXPIRED = "expired"
+FAILED = "failed"
+
+
+def profile_story_data(user: User) -> Optional[StoryData]:
+    if not user or not user.child_name:
+        return None
+    return StoryData(
+        hero=user.child_name,
+        age=user.child_age,
+        theme=user.child_pers or None,
+    )
+
+
+def draft_key(payload: StoryData) -> str:
+    # 프로필 초안은 제목 없이 만들고 화면에서는 제목을 항상 입력하므로, 제목을 빼고 hero/age/theme/extra 로 매칭
+    # (claim 시 요청 제목으로 바꿈. 첫 장면 이미지는 제목이 프롬프트에 들어가므로 take_draft_image 가 제목이 같을 때만 재사용)
+    data = normalize_story_data(payload)
+    data.pop("title", None)
+    raw = json.dumps(data, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _remove_image(draft: StoryDraft) -> None:
+    if draft.image_path:
+        try:
+            os.remove(draft.image_path)
+        except OSError:
+            pass
+        draft.image_path = None
+
+
+def expire_drafts(db: Session, user_id: Optional[int] = None) -> int:
+    now = int(time.time())
+    q = db.query(StoryDraft).filter(
+        StoryDraft.status.in_((PENDING, READY)),
+        StoryDraft.expires_at < now,
+    )
+    if user_id is not None:
+        q = q.filter(StoryDraft.user_id == user_id)
+    rows: List[StoryDraft] = q.all()
+    for row in rows:
+        row.status = EXPIRED
+        _remove_image(row)
+
+    # /clova/make 로 claim 됐지만 /story/make 가 이미지를 가져가지 않은 초안
+    q = db.query(StoryDraft).filter(
+        StoryDraft.status == CLAIMED,
+        StoryDraft.image_path.isnot(None),
+        StoryDraft.expires_at < now,
+    )
+    if user_id is not None:
+        q = q.filter(StoryDraft.user_id == user_id)
+    for row in q.all():
+        _remove_image(row)
+    db.commit()
+    return len(rows)
+
+
+def expire_stale_drafts() -> int:
+    db = SessionLocal()
+    try:
+        return expire_drafts(db)
+    finally:
+        db.close()
+
+
+def speculate_for_user(user_id: int) -> Optional[int]:
+    """백그라운드 작업: 조건이 맞으면 초안을 하나 생성하고 draft id 반환."""
+    if not SPECULATIVE_ENABLED:
+        return None
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user or not user.speculate:
+            return None
+        payload = profile_story_data(user)
+        if payload is None:
+            return None
+
+        expire_drafts(db, user_id)
+        now = int(time.time())
+        key = draft_key(payload)
+
+        live = db.query(StoryDraft).filter(
+            StoryDraft.user_id == user_id,
+            StoryDraft.key == key,
+            StoryDraft.status.in_((PENDING, READY)),
+        ).first()
+        if live:
+            return live.id
+
+        used = db.query(StoryDraft).filter(
+            StoryDraft.user_id == user_id,
+            StoryDraft.created_at >= now - 86400,
+        ).count()
+        if used >= SPECULATIVE_DAILY_CAP:
+            return None
+
+        draft = StoryDraft(
+            user_id=user_id,
+            key=key,
+            status=PENDING,
+            created_at=now,
+            expires_at=now + SPECULATIVE_TTL_SECONDS,
+        )
+        db.add(draft)
+        db.commit()
+
+        try:
+            story = make_story_text(payload, user_id=user_id, priority=BATCH, fallback=False)
+        except Exception as e:
+            print("speculative draft failed:", e)
+            draft.status = FAILED
+            db.commit()
+            return None
+
+        draft.title = story.title
+        draft.content = json.dumps([p.dict() for p in story.paragraphs], ensure_ascii=False)
+        db.commit()
+
+        if SPECULATIVE_IMAGE and story.paragraphs:
+            first = story.paragraphs[0]
+            path = os.path.join(DRAFTS_DIR, f"{draft.id}.png")
+            if render_scene_image(
+                story.title, first.title, first.text, 1, len(story.paragraphs),
+                path, user_id=user_id, priority=BATCH,
+            ):
+                draft.image_path = path
+                db.commit()
+
+        # 생성 중에 TTL 이 지나 expired 처리됐을 수 있음
+        db.refresh(draft)
+        if draft.status == PENDING:
+            draft.status = READY
+        else:
+            _remove_image(draft)
+        db.commit()
+        return draft.id
+    finally:
+        db.close()
+
+
+def claim_draft(db: Session, user_id: int, payload: StoryData) -> Optional[StoryCreate]:
+    key = draft_key(payload)
+    deadline = time.monotonic() + SPECULATIVE_CLAIM_WAIT
+    while True:
+        now = int(time.time())
+        draft = (
+            db.query(StoryDraft)
+            .filter(
+                StoryDraft.user_id == user_id,
+                StoryDraft.key == key,
+                StoryDraft.status.in_((PENDING, READY)),
+                StoryDraft.expires_at >= now,
+            )
+            .order_by(StoryDraft.id.desc())
+            .first()
+        )
+        if draft is None:
+            return None
+        if draft.status == READY:
+            break
+        # 같은 호출이 이미 진행 중이면 중복 호출 대신 잠깐 기다림
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(0.25)
+        db.expire_all()
+
+    claimed = (
+        db.query(StoryDraft)
+        .filter(StoryDraft.id == draft.id, StoryDraft.status == READY)
+        # 첫 장면 이미지는 claim 후 TTL 동안 /story/make 가 가져가길 기다림
+        .update(
+            {StoryDraft.status: CLAIMED, StoryDraft.expires_at: now + SPECULATIVE_TTL_SECONDS},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if not claimed:
+        return None
+
+    paragraphs = [StoryParagraph(**p) for p in json.loads(draft.content or "[]")]
+    title = (payload.title or "").strip() or draft.title
+    return StoryCreate(title=title, paragraphs=paragraphs, draft_id=draft.id)
+
+
+def take_draft_image(db: Session, draft_id: int, user_id: int, story: StoryCreate) -> Optional[str]:
+    """claim 된 초안의 첫 장면 이미지를 이 스토리에 그대로 쓸 수 있으면 경로 반환."""
+    draft = db.query(StoryDraft).filter(
+        StoryDraft.id == draft_id,
+        StoryDraft.user_id == user_id,
+        StoryDraft.status == CLAIMED,
+    ).first()
+    if not draft or not draft.image_path or not story.paragraphs:
+        return None
+
+    path = draft.image_path
+    draft.image_path = None
+    db.commit()
+
+    # 제목/첫 장면이 바뀌었으면 그 이미지는 다른 프롬프트로 그린 것
+    paragraphs = json.loads(draft.content or "[]")
+    first = story.paragraphs[0]
+    if (
+        story.title != draft.title
+        or not paragraphs
+        or paragraphs[0].get("title") != first.title
+        or paragraphs[0].get("text") != first.text
+        or len(paragraphs) != len(story.paragraphs)
+    ):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+    return path
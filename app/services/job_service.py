@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+from sqlalchemy import text
+from app.core.database import engine, SessionLocal
+from app.core.coordination import worker_id
+from app.core.scheduler import INTERACTIVE, REGENERATE
+from app.models.story_model import Story
+from app.schemas.story_schemas import StoryLoad, StoryParagraph
+from app.services.story_service import create_images_for_story, finalize_story_images, TIER_DRAFT
+
+# jobs 테이블 기반 작업 큐
+# - claim 한 worker 가 lease 를 heartbeat 로 연장, 죽으면 lease 만료 후 다른 worker 가 이어받음
+# - 같은 key 는 한 번만 쌓임
+# - 핸들러는 재실행해도 안전해야 함 (이미 있는 장면은 건너뜀)
+
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL", "2"))
+# run_job_inline 이 다른 worker 가 실행 중인 같은 작업을 기다리는 최대 시간
+JOB_INLINE_WAIT_SECONDS = float(os.getenv("JOB_INLINE_WAIT", "300"))
+JOB_INLINE_POLL_SECONDS = 0.5
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# handler(payload, priority, lost): lost 가 set 되면 lease 를 잃은 것이므로 저장하지 말고 중단
+JobHandler = Callable[[dict, int, threading.Event], None]
+_handlers: Dict[str, JobHandler] = {}
+
+
+class LeaseLost(Exception):
+    pass
+
+
+def register_job(kind: str, handler: JobHandler) -> None:
+    _handlers[kind] = handler
+
+
+def enqueue_job(kind: str, key: str, payload: dict) -> None:
+    now = time.time()
+    with engine.begin() as conn:
+        # 끝난 작업은 다시 큐에 넣고, 대기/실행 중이면 그대로 둠
+        conn.execute(
+            text(
+                "INSERT INTO jobs (kind, key, payload, status, attempts, created_at, updated_at) "
+                "VALUES (:kind, :key, :payload, :queued, 0, :now, :now) "
+                "ON CONFLICT (key) DO UPDATE SET status = :queued, payload = excluded.payload, "
+                "attempts = 0, owner = NULL, lease_expires_at = NULL, last_error = NULL, updated_at = :now "
+                "WHERE jobs.status IN (:done, :failed)"
+            ),
+            {
+                "kind": kind, "key": key, "payload": json.dumps(payload),
+                "queued": QUEUED, "done": DONE, "failed": FAILED, "now": now,
+            },
+        )
+
+
+def start_job(kind: str, key: str, payload: dict, owner: str) -> Optional[dict]:
+    """작업을 owner 가 실행 중인 상태로 바로 넣음 (enqueue 후 claim 사이에 다른 worker 가 가져가지 않도록).
+    같은 key 가 대기/실행 중이면 None."""
+    now = time.time()
+    with engine.begin() as conn:
+        row = conn.execute(
+            text(
+                "INSERT INTO jobs (kind, key, payload, status, owner, lease_expires_at, attempts, created_at, updated_at) "
+                "VALUES (:kind, :key, :payload, :running, :owner, :exp, 1, :now, :now) "
+                "ON CONFLICT (key) DO UPDATE SET status = :running, payload = excluded.payload, "
+                "attempts = 1, owner = :owner, lease_expires_at = :exp, last_error = NULL, updated_at = :now "
+                "WHERE jobs.status IN (:done, :failed) "
+                "RETURNING id, kind, key, payload, attempts"
+            ),
+            {
+                "kind": kind, "key": key, "payload": json.dumps(payload), "owner": owner,
+                "exp": now + JOB_LEASE_SECONDS, "now": now,
+                "running": RUNNING, "done": DONE, "failed": FAILED,
+            },
+        ).mappings().first()
+    return dict(row) if row else None
+
+
+def job_status(key: str) -> Optional[str]:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT status FROM jobs WHERE key = :key"), {"key": key}).scalar()
+
+
+def claim_job(owner: str, key: Optional[str] = None) -> Optional[dict]:
+    """대기 중이거나 lease 가 만료된 작업 하나를 가져옴. key 를 주면 그 작업만."""
+    now = time.time()
+    cond = (
+        "(status = :queued OR (status = :running AND lease_expires_at < :now)) "
+        "AND attempts < :max_attempts"
+    )
+    params = {
+        "owner": owner, "now": now, "exp": now + JOB_LEASE_SECONDS,
+        "queued": QUEUED, "running": RUNNING, "max_attempts": JOB_MAX_ATTEMPTS,
+    }
+    pick = f"SELECT id FROM jobs WHERE {cond}"
+    if key is not None:
+        pick += " AND key = :key"
+        params["key"] = key
+    pick += " ORDER BY id LIMIT 1"
+    with engine.begin() as conn:
+        row = conn.execute(
+            text(
+                f"UPDATE jobs SET status = :running, owner = :owner, lease_expires_at = :exp, "
+                f"attempts = attempts + 1, updated_at = :now "
+                f"WHERE id = ({pick}) AND {cond} "
+                f"RETURNING id, kind, key, payload, attempts"
+            ),
+            params,
+        ).mappings().first()
+    return dict(row) if row else None
+
+
+def heartbeat_job(job_id: int, owner: str) -> bool:
+    now = time.time()
+    with engine.begin() as conn:
+        res = conn.execute(
+            text(
+                "UPDATE jobs SET lease_expires_at = :exp, updated_at = :now "
+                "WHERE id = :id AND owner = :owner AND status = :running"
+            ),
+            {"id": job_id, "owner": owner, "exp": now + JOB_LEASE_SECONDS, "now": now, "running": RUNNING},
+        )
+        return res.rowcount == 1
+
+
+def finish_job(job_id: int, owner: str, error: Optional[str] = None) -> None:
+    now = time.time()
+    with engine.begin() as conn:
+        if error is None:
+            conn.execute(
+                text(
+                    "UPDATE jobs SET status = :done, lease_expires_at = NULL, last_error = NULL, updated_at = :now "
+                    "WHERE id = :id AND owner = :owner"
+                ),
+                {"id": job_id, "owner": owner, "done": DONE, "now": now},
+            )
+        else:
+            # 시도 횟수가 남아 있으면 다시 대기열로
+            conn.execute(
+                text(
+                    "UPDATE jobs SET status = CASE WHEN attempts >= :max_attempts THEN :failed ELSE :queued END, "
+                    "lease_expires_at = NULL, last_error = :error, updated_at = :now "
+                    "WHERE id = :id AND owner = :owner"
+                ),
+                {
+                    "id": job_id, "owner": owner, "error": error[-2000:], "now": now,
+                    "max_attempts": JOB_MAX_ATTEMPTS, "failed": FAILED, "queued": QUEUED,
+                },
+            )
+
+
+@contextmanager
+def _heartbeat(job_id: int, owner: str):
+    stop = threading.Event()
+    lost = threading.Event()
+
+    def _beat():
+        last_ok = time.monotonic()
+        while not stop.wait(JOB_LEASE_SECONDS / 3):
+            try:
+                if not heartbeat_job(job_id, owner):
+                    lost.set()
+                    return
+                last_ok = time.monotonic()
+            except Exception as e:
+                # SQLite "database is locked" 등 일시적 오류는 다음 주기에 재시도, lease 가 끝날 때까지 실패하면 lost
+                print(f"job {job_id} heartbeat error:", e)
+                if time.monotonic() - last_ok >= JOB_LEASE_SECONDS:
+                    lost.set()
+                    return
+
+    beater = threading.Thread(target=_beat, name=f"job:{job_id}", daemon=True)
+    beater.start()
+    try:
+        yield lost
+    finally:
+        stop.set()
+        beater.join()
+
+
+def run_job(job: dict, owner: str, priority: int = REGENERATE) -> bool:
+    handler = _handlers.get(job["kind"])
+    if handler is None:
+        finish_job(job["id"], owner, error=f"unknown job kind: {job['kind']}")
+        return False
+    try:
+        with _heartbeat(job["id"], owner) as lost:
+            handler(json.loads(job["payload"] or "{}"), priority, lost)
+            if lost.is_set():
+                raise LeaseLost(f"lease lost for job {job['id']}")
+    except LeaseLost as e:
+        # 이미 다른 worker 가 가져갔으므로 상태를 건드리지 않음
+        print(e)
+        return False
+    except Exception as e:
+        finish_job(job["id"], owner, error=repr(e))
+        return False
+    finish_job(job["id"], owner)
+    return True
+
+
+def _claim_owner() -> str:
+    # 같은 프로세스의 스레드(요청 스레드, job 루프)끼리도 owner 가 달라야 heartbeat/finish 가 섞이지 않음
+    return f"{worker_id()}:{uuid.uuid4().hex[:8]}"
+
+
+def run_job_inline(
+    kind: str,
+    key: str,
+    payload: dict,
+    priority: int = INTERACTIVE,
+    wait: float = JOB_INLINE_WAIT_SECONDS,
+) -> bool:
+    """요청 처리 중인 worker 가 작업을 넣고 직접 실행 (죽으면 다른 worker 가 이어받음).
+    같은 key 를 다른 worker 가 이미 실행 중이면 끝날 때까지 기다림."""
+    owner = _claim_owner()
+    job = start_job(kind, key, payload, owner) or claim_job(owner, key=key)
+    if job is not None:
+        return run_job(job, owner, priority=priority)
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        status = job_status(key)
+        if status in (DONE, FAILED, None):
+            return status == DONE
+        time.sleep(JOB_INLINE_POLL_SECONDS)
+    return False
+
+
+def fail_exhausted_jobs() -> None:
+    # 시도 횟수를 다 쓴 채로 lease 가 만료된 작업 (worker 가 계속 죽는 경우)
+    now = time.time()
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "UPDATE jobs SET status = :failed, updated_at = :now "
+                "WHERE status = :running AND lease_expires_at < :now AND attempts >= :max_attempts"
+            ),
+            {"failed": FAILED, "running": RUNNING, "now": now, "max_attempts": JOB_MAX_ATTEMPTS},
+        )
+
+
+def run_next_job() -> bool:
+    owner = _claim_owner()
+    fail_exhausted_jobs()
+    job = claim_job(owner)
+    if job is None:
+        return False
+    run_job(job, owner)
+    return True
+
+
+# ---------- handlers ----------
+
+def _render_story(payload: dict, priority: int, lost: threading.Event) -> None:
+    db = SessionLocal()
+    try:
+        story = db.query(Story).filter(Story.id == payload["story_id"]).first()
+        if story is None:
+            return
+        paragraphs = [StoryParagraph(**p) for p in json.loads(story.content or "[]")]
+        story_load = StoryLoad(id=story.id, title=story.title, paragraphs=paragraphs)
+        pre_rendered = {int(k): v for k, v in (payload.get("pre_rendered") or {}).items()}
+        results = create_images_for_story(
+            db,
+            story_load,
+            progressive=payload.get("progressive", False),
+            priority=priority,
+            pre_rendered=pre_rendered,
+            cancelled=lost,
+        )
+    finally:
+        db.close()
+    if lost.is_set():
+        return
+
+    # draft 로 그린 장면은 final 렌더 작업으로 넘김 (어느 worker 든 가져감)
+    if any(r.tier == TIER_DRAFT for r in results):
+        enqueue_job("finalize_story", finalize_job_key(payload["story_id"]), {"story_id": payload["story_id"]})
+
+
+def _finalize_story(payload: dict, priority: int, lost: threading.Event) -> None:
+    finalize_story_images(payload["story_id"], cancelled=lost)
+
+
+def render_job_key(story_id: int) -> str:
+    return f"story:{story_id}:render"
+
+
+def finalize_job_key(story_id: int) -> str:
+    return f"story:{story_id}:finalize"
+
+
+register_job("render_story", _render_story)
+register_job("finalize_story", _finalize_story)
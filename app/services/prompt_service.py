@@ -0,0 +1,97 @@
+import json
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+from app.models.story_model import PromptTemplate, StoryImage
+
+# 이미지 프롬프트 템플릿. 한 번 배포된 버전은 수정하지 말고 새 버전을 추가할 것
+# (prompt_templates 테이블에 저장된 본문으로 예전 이미지 프롬프트를 그대로 복원)
+
+_BASE_STYLE_V1 = (
+    "아래 원칙을 모든 장면에 동일하게 적용해.\n"
+    "- 동화 제목: {story_title}\n"
+    "- 주인공의 외형/의상/헤어스타일/소품은 첫 장면에서 정한 설정을 끝까지 유지해.\n"
+    "- 장면에 언급되지 않은 인물/사물/문구는 넣지 마.\n"
+    "- 그림에 글자/워터마크/로고/텍스트를 넣지 마.\n"
+    "- 따뜻한 색감, 부드러운 일러스트, 아동 친화적 스타일, 1:1 구도.\n"
+    "- 배경은 장면에 필요한 요소만 간결하게.\n"
+    "\nApply the following rules consistently across all scenes:\n"
+    "- Story title: {story_title}\n"
+    "- Keep the main character's appearance/outfit/hair/props consistent across scenes.\n"
+    "- Do NOT add any characters/objects/text that are not mentioned.\n"
+    "- No text/watermark/logo in the image.\n"
+    "- Warm palette, soft children's illustration style, square (1:1) composition.\n"
+    "- Keep backgrounds minimal and relevant to the scene.\n"
+)
+
+_SCENE_PROMPT_V1 = (
+    "아래의 장면 설명과 규칙을 ‘정확히’ 반영한 유아용 동화 일러스트 1장을 생성해.\n"
+    + _BASE_STYLE_V1 + "\n"
+    "[장면 {scene_idx}/{scene_total}]\n"
+    "- 장면 제목: {scene_title}\n"
+    "- 장면 요약: {scene_text}\n"
+    "- 반드시 요약에 언급된 행동/감정/사물 중심으로 그려.\n"
+    "- 추가 인물/소품을 임의로 만들지 마.\n"
+    "- 카메라 구도는 주인공과 핵심 사건이 한눈에 보이도록.\n"
+    "\nGenerate ONE children's story illustration that matches the scene EXACTLY.\n"
+    + _BASE_STYLE_V1 + "\n"
+    "[Scene {scene_idx}/{scene_total}]\n"
+    "- Scene title: {scene_title}\n"
+    "- Scene summary (Korean): {scene_text}\n"
+    "- Depict ONLY what is described (characters, objects, emotions, actions).\n"
+    "- Do NOT invent extra characters or items.\n"
+    "- Ensure the main character is clearly visible; keep the same look as previous scenes.\n"
+)
+
+PROMPT_TEMPLATES: Dict[int, str] = {
+    1: _SCENE_PROMPT_V1,
+}
+CURRENT_TEMPLATE_ID = max(PROMPT_TEMPLATES)
+
+# 템플릿 본문은 불변이라 프로세스 내 캐시
+_template_cache: Dict[int, str] = {}
+
+
+def scene_params(scene_title: str, scene_text: str, scene_idx: int, scene_total: int) -> dict:
+    return {
+        "scene_title": scene_title,
+        "scene_text": scene_text,
+        "scene_idx": scene_idx,
+        "scene_total": scene_total,
+    }
+
+
+def render(template_body: str, story_title: str, params: dict) -> str:
+    return template_body.format(story_title=story_title, **params)
+
+
+def get_template(db: Session, template_id: int) -> str:
+    body = _template_cache.get(template_id)
+    if body is None:
+        row = db.query(PromptTemplate).filter(PromptTemplate.id == template_id).first()
+        if row is None:
+            raise LookupError(f"prompt template {template_id} not found")
+        body = _template_cache[template_id] = row.body
+    return body
+
+
+def ensure_current_template(db: Session) -> int:
+    # migration 이후 코드에 새 버전이 추가된 경우 첫 사용 시 등록
+    if CURRENT_TEMPLATE_ID in _template_cache:
+        return CURRENT_TEMPLATE_ID
+    row = db.query(PromptTemplate).filter(PromptTemplate.id == CURRENT_TEMPLATE_ID).first()
+    if row is None:
+        row = PromptTemplate(id=CURRENT_TEMPLATE_ID, body=PROMPT_TEMPLATES[CURRENT_TEMPLATE_ID])
+        db.add(row)
+        db.flush()
+    _template_cache[CURRENT_TEMPLATE_ID] = row.body
+    return CURRENT_TEMPLATE_ID
+
+
+def render_image_prompt(db: Session, image: StoryImage, story_title: Optional[str] = None) -> str:
+    # 예전 행(압축 전)은 prompt 에 전체 텍스트가 남아 있음
+    if image.prompt:
+        return image.prompt
+    if story_title is None:
+        story_title = image.story.title
+    params = json.loads(image.prompt_params or "{}")
+    return render(get_template(db, image.prompt_template_id), story_title, params)
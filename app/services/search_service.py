@@ -0,0 +1,138 @@
+import html
+import json
+import re
+from typing import List, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.models.story_model import Story
+from app.schemas.story_schemas import StorySearchHit
+
+# stories.id 를 rowid 로 쓰는 FTS5 테이블 (migrations 에서 생성)
+SEARCH_TABLE = "story_search"
+
+# bm25 컬럼 가중치: 제목 매칭을 본문보다 우선
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r"[^\s\"'()*:^+\-]+")
+
+# snippet 의 하이라이트 구분자: 본문에 나오지 않는 private-use 문자로 받은 뒤
+# 본문을 escape 하고 나서 <mark> 로 바꿈 (본문은 사용자/LLM 입력이라 그대로 HTML 로 내보내면 안 됨)
+_MARK_OPEN = "\ue000"
+_MARK_CLOSE = "\ue001"
+
+
+def _story_body(content: str) -> str:
+    try:
+        paragraphs = json.loads(content or "[]")
+    except ValueError:
+        return content or ""
+    lines = []
+    for p in paragraphs:
+        if not isinstance(p, dict):
+            continue
+        lines.append(p.get("title") or "")
+        lines.append(p.get("text") or "")
+    return "\n".join(line for line in lines if line)
+
+
+def build_match_query(q: str) -> str:
+    # 사용자 입력을 FTS5 문법으로 해석하지 않도록 토큰마다 따옴표 + prefix 매칭
+    # (한국어는 조사가 붙으므로 "우주" 가 "우주을" 에도 걸리게 *)
+    tokens = _TOKEN_RE.findall(q or "")
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def index_story(db: Session, story: Story) -> None:
+    db.execute(
+        text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"),
+        {"id": story.id},
+    )
+    db.execute(
+        text(f"INSERT INTO {SEARCH_TABLE}(rowid, title, body) VALUES (:id, :title, :body)"),
+        {"id": story.id, "title": story.title, "body": _story_body(story.content)},
+    )
+
+
+def _snippet_html(raw: str) -> str:
+    return html.escape(raw).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+def search_stories(
+    db: Session,
+    user_id: int,
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+) -> Tuple[int, List[StorySearchHit]]:
+    match = build_match_query(q)
+    if not match:
+        return 0, []
+
+    params = {"match": match, "user_id": user_id, "limit": limit, "offset": offset}
+
+    total = db.execute(
+        text(
+            f"SELECT count(*) FROM {SEARCH_TABLE} "
+            f"JOIN stories s ON s.id = {SEARCH_TABLE}.rowid "
+            f"WHERE {SEARCH_TABLE} MATCH :match AND s.user_id = :user_id"
+        ),
+        params,
+    ).scalar() or 0
+
+    rows = db.execute(
+        text(
+            f"SELECT s.id, s.title, "
+            f"snippet({SEARCH_TABLE}, 1, :mark_open, :mark_close, '…', 16) AS snippet, "
+            f"bm25({SEARCH_TABLE}, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS rank "
+            f"FROM {SEARCH_TABLE} "
+            f"JOIN stories s ON s.id = {SEARCH_TABLE}.rowid "
+            f"WHERE {SEARCH_TABLE} MATCH :match AND s.user_id = :user_id "
+            f"ORDER BY rank LIMIT :limit OFFSET :offset"
+        ),
+        {**params, "mark_open": _MARK_OPEN, "mark_close": _MARK_CLOSE},
+    ).all()
+
+    hits = [
+        StorySearchHit(story_id=r.id, title=r.title, snippet=_snippet_html(r.snippet or ""), rank=float(r.rank))
+        for r in rows
+    ]
+    return total, hits
+
+
+def reindex_all(db: Session, batch_size: int = 200) -> int:
+    db.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    count = 0
+    last_id = 0
+    while True:
+        batch = (
+            db.query(Story)
+            .filter(Story.id > last_id)
+            .order_by(Story.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        for story in batch:
+            index_story(db, story)
+        db.commit()
+        count += len(batch)
+        last_id = batch[-1].id
+    db.commit()
+    return count
+
+
+def main():
+    # 기존 stories 백필: python -m app.services.search_service
+    db = SessionLocal()
+    try:
+        n = reindex_all(db)
+        print(f"indexed {n} stories into {SEARCH_TABLE}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
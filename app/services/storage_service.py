@@ -0,0 +1,187 @@
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Set
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.models.story_model import Story, StoryImage
+from app.models.user_model import User
+
+STORIES_DIR = os.path.join("static", "stories")
+
+# 사용자별 이미지 저장 한도(MB). 기본은 무제한(0), 운영에서 켤 때 STORAGE_QUOTA_MB 로 설정
+# (final 장면 하나가 약 1.5 MB, 5장면 동화 한 편이 약 7~8 MB → 예: 100편 ≈ 800)
+STORAGE_QUOTA_BYTES = int(float(os.getenv("STORAGE_QUOTA_MB", "0")) * 1024 * 1024)
+
+# reaper 설정: 한 번에 살펴볼 스토리 디렉터리 수 / 주기 / 생성 중인 파일 보호 시간
+GC_BATCH_SIZE = int(os.getenv("STORAGE_GC_BATCH", "50"))
+GC_INTERVAL_SECONDS = float(os.getenv("STORAGE_GC_INTERVAL", "300"))
+GC_GRACE_SECONDS = float(os.getenv("STORAGE_GC_GRACE", "3600"))
+
+
+class StorageQuotaExceeded(Exception):
+    def __init__(self, used: int, quota: int):
+        super().__init__(f"storage quota exceeded: {used} / {quota} bytes")
+        self.used = used
+        self.quota = quota
+
+
+def _norm(path: str) -> str:
+    # 윈도우에서 저장된 행은 "static\\stories\\4\\01.png" 형태
+    return os.path.normpath((path or "").replace("\\", "/"))
+
+
+def file_size(path: str) -> int:
+    try:
+        return os.path.getsize(_norm(path))
+    except OSError:
+        return 0
+
+
+def get_usage(db: Session, user_id: int) -> int:
+    used = db.query(User.storage_bytes).filter(User.id == user_id).scalar()
+    return int(used or 0)
+
+
+def ensure_quota(db: Session, user_id: int) -> None:
+    if STORAGE_QUOTA_BYTES <= 0:
+        return
+    used = get_usage(db, user_id)
+    if used >= STORAGE_QUOTA_BYTES:
+        raise StorageQuotaExceeded(used, STORAGE_QUOTA_BYTES)
+
+
+def add_usage(db: Session, user_id: int, nbytes: int) -> None:
+    if not nbytes:
+        return
+    db.query(User).filter(User.id == user_id).update(
+        {User.storage_bytes: User.storage_bytes + nbytes},
+        synchronize_session=False,
+    )
+
+
+def recompute_usage(db: Session) -> None:
+    # cascade 삭제 등으로 어긋난 카운터를 story_images 기준으로 다시 맞춤
+    db.execute(text(
+        'UPDATE "user" SET storage_bytes = COALESCE(('
+        "SELECT SUM(si.size_bytes) FROM story_images si "
+        'JOIN stories s ON s.id = si.story_id WHERE s.user_id = "user".id), 0)'
+    ))
+
+
+def _story_dirs() -> List[int]:
+    try:
+        names = os.listdir(STORIES_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(int(n) for n in names if n.isdigit() and os.path.isdir(os.path.join(STORIES_DIR, n)))
+
+
+def _is_fresh(path: str, now: float) -> bool:
+    try:
+        return now - os.path.getmtime(path) < GC_GRACE_SECONDS
+    except OSError:
+        return False
+
+
+class StorageReaper:
+    """static/stories 를 story_images 와 대조해 고아 파일/디렉터리를 조금씩 정리."""
+
+    def __init__(self, batch_size: int = GC_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.cursor = 0
+        self.stats: Dict[str, int] = {"removed_files": 0, "removed_dirs": 0, "freed_bytes": 0}
+
+    def run_once(self, db: Session) -> Dict[str, int]:
+        now = time.time()
+        ids = [i for i in _story_dirs() if i > self.cursor][: self.batch_size]
+        if not ids:
+            # 한 바퀴 다 돌았으면 카운터 보정 후 처음부터
+            self.cursor = 0
+            recompute_usage(db)
+            db.commit()
+            return dict(self.stats)
+
+        live: Set[int] = {
+            sid for (sid,) in db.query(Story.id).filter(Story.id.in_(ids)).all()
+        }
+        referenced: Dict[int, Set[str]] = {}
+        for img in db.query(StoryImage).filter(StoryImage.story_id.in_(live)).all():
+            referenced.setdefault(img.story_id, set()).add(_norm(img.file_path))
+            if not img.size_bytes:
+                img.size_bytes = file_size(img.file_path)
+
+        for story_id in ids:
+            story_dir = os.path.join(STORIES_DIR, str(story_id))
+            if story_id not in live:
+                if not _is_fresh(story_dir, now):
+                    self._remove_dir(story_dir)
+                continue
+            keep = referenced.get(story_id, set())
+            for name in os.listdir(story_dir):
+                path = os.path.join(story_dir, name)
+                if _norm(path) in keep or _is_fresh(path, now):
+                    continue
+                self._remove_file(path)
+            if not os.listdir(story_dir) and not _is_fresh(story_dir, now):
+                os.rmdir(story_dir)
+                self.stats["removed_dirs"] += 1
+
+        self.cursor = ids[-1]
+        db.commit()
+        return dict(self.stats)
+
+    def _remove_file(self, path: str) -> None:
+        size = file_size(path)
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError as e:
+            print("storage reaper: remove failed:", path, e)
+            return
+        self.stats["removed_files"] += 1
+        self.stats["freed_bytes"] += size
+
+    def _remove_dir(self, path: str) -> None:
+        size = 0
+        count = 0
+        for root, _, files in os.walk(path):
+            for f in files:
+                size += file_size(os.path.join(root, f))
+                count += 1
+        try:
+            shutil.rmtree(path)
+        except OSError as e:
+            print("storage reaper: remove failed:", path, e)
+            return
+        self.stats["removed_files"] += count
+        self.stats["removed_dirs"] += 1
+        self.stats["freed_bytes"] += size
+
+
+reaper = StorageReaper()
+
+
+def reap_once(reaper_: Optional[StorageReaper] = None) -> Dict[str, int]:
+    db = SessionLocal()
+    try:
+        return (reaper_ or reaper).run_once(db)
+    finally:
+        db.close()
+
+
+def main():
+    # 전체 정리 한 번: python -m app.services.storage_service
+    r = StorageReaper()
+    while True:
+        reap_once(r)
+        if r.cursor == 0:
+            break
+    print(r.stats)
+
+
+if __name__ == "__main__":
+    main()
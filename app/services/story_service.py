@@ -1,23 +1,44 @@
 import os
 import json
-import time
-from typing import List
+import threading
+from typing import Dict, List, Optional
 from dotenv import load_dotenv, find_dotenv
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from google import genai
-from google.genai import types
-from google.genai import errors as genai_errors
+from app.core import providers
+from app.core.database import SessionLocal
+from app.core.scheduler import scheduler, INTERACTIVE, REGENERATE
 from app.models.story_model import Story, StoryImage
 from app.schemas.story_schemas import StoryCreate, StoryLoad, StoryImageOut
+from app.services.search_service import index_story
+from app.services.storage_service import add_usage, file_size
+from app.services.viewer_service import invalidate_story_view
+from app.services.prompt_service import (
+    PROMPT_TEMPLATES,
+    CURRENT_TEMPLATE_ID,
+    ensure_current_template,
+    render,
+    render_image_prompt,
+    scene_params,
+)
 
 load_dotenv(find_dotenv(), override=False)
 
 IMAGEN_MODEL = os.getenv("GEMINI_IMAGE_MODEL", "imagen-3.0-generate-002")
+# progressive(초안 → final) 모드용 빠른 모델. final 보다 가볍고 빠른 모델을 직접 지정한 경우에만 사용
+# (미설정이면 progressive 요청도 final 한 번만 그림)
+IMAGEN_DRAFT_MODEL = os.getenv("GEMINI_IMAGE_DRAFT_MODEL", "")
+PROGRESSIVE_AVAILABLE = bool(IMAGEN_DRAFT_MODEL)
+
+TIER_DRAFT = "draft"
+TIER_FINAL = "final"
 
 def create_story(db: Session, payload: StoryCreate, user_id: int) -> Story:
     content = json.dumps([p.dict() for p in payload.paragraphs], ensure_ascii=False)
     row = Story(user_id=user_id, title=payload.title, content=content)
     db.add(row)
+    db.flush()
+    index_story(db, row)
     db.commit()
     db.refresh(row)
     return row
@@ -25,103 +46,188 @@ def create_story(db: Session, payload: StoryCreate, user_id: int) -> Story:
 def _ensure_dir(path: str):
     os.makedirs(os.path.dirname(path), exist_ok=True)
 
-def build_base_style_prompt(story_title: str) -> str:
-    return (
-        "아래 원칙을 모든 장면에 동일하게 적용해.\n"
-        f"- 동화 제목: {story_title}\n"
-        "- 주인공의 외형/의상/헤어스타일/소품은 첫 장면에서 정한 설정을 끝까지 유지해.\n"
-        "- 장면에 언급되지 않은 인물/사물/문구는 넣지 마.\n"
-        "- 그림에 글자/워터마크/로고/텍스트를 넣지 마.\n"
-        "- 따뜻한 색감, 부드러운 일러스트, 아동 친화적 스타일, 1:1 구도.\n"
-        "- 배경은 장면에 필요한 요소만 간결하게.\n"
-        "\nApply the following rules consistently across all scenes:\n"
-        f"- Story title: {story_title}\n"
-        "- Keep the main character's appearance/outfit/hair/props consistent across scenes.\n"
-        "- Do NOT add any characters/objects/text that are not mentioned.\n"
-        "- No text/watermark/logo in the image.\n"
-        "- Warm palette, soft children's illustration style, square (1:1) composition.\n"
-        "- Keep backgrounds minimal and relevant to the scene.\n"
-    )
-
-def _build_prompt(story_title: str, scene_title: str, scene_text: str, scene_idx: int, scene_total: int, base_style: str) -> str:
-    return (
-        "아래의 장면 설명과 규칙을 ‘정확히’ 반영한 유아용 동화 일러스트 1장을 생성해.\n"
-        f"{base_style}\n"
-        f"[장면 {scene_idx}/{scene_total}]\n"
-        f"- 장면 제목: {scene_title}\n"
-        f"- 장면 요약: {scene_text}\n"
-        "- 반드시 요약에 언급된 행동/감정/사물 중심으로 그려.\n"
-        "- 추가 인물/소품을 임의로 만들지 마.\n"
-        "- 카메라 구도는 주인공과 핵심 사건이 한눈에 보이도록.\n"
-        "\nGenerate ONE children's story illustration that matches the scene EXACTLY.\n"
-        f"{base_style}\n"
-        f"[Scene {scene_idx}/{scene_total}]\n"
-        f"- Scene title: {scene_title}\n"
-        f"- Scene summary (Korean): {scene_text}\n"
-        "- Depict ONLY what is described (characters, objects, emotions, actions).\n"
-        "- Do NOT invent extra characters or items.\n"
-        "- Ensure the main character is clearly visible; keep the same look as previous scenes.\n"
-    )
-
-def create_images_for_story(db: Session, story: StoryLoad) -> List[StoryImageOut]:
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GEMINI_API_KEY 또는 GOOGLE_API_KEY 환경변수를 설정하세요.")
-
-    client = genai.Client(api_key=api_key)
-    story_id = story.id
-    out_dir = os.path.join("static", "stories", str(story_id))
-    results: List[StoryImageOut] = []
-
-    total = len(story.paragraphs)
-    base_style = build_base_style_prompt(story.title)
+def _generate_image(client, model: str, prompt: str, user_id=None, priority: int = INTERACTIVE):
+    from google.genai import types
+    from google.genai import errors as genai_errors
 
-    for idx, para in enumerate(story.paragraphs, start=1):
-        prompt = _build_prompt(
-            story_title=story.title,
-            scene_title=para.title,
-            scene_text=para.text,
-            scene_idx=idx,
-            scene_total=total,
-            base_style=base_style,
-        )
-        try:
+    try:
+        with scheduler.slot("imagen", user_id=user_id, priority=priority):
             resp = client.models.generate_images(
-                model=IMAGEN_MODEL,
+                model=model,
                 prompt=prompt,
                 config=types.GenerateImagesConfig(
                     number_of_images=1,
                     output_mime_type="image/png",
                 ),
             )
-        except genai_errors.APIError as e:
-            print("GenAI API error:", e)
-            continue
-        except Exception as e:
-            print("Unexpected image gen error:", e)
-            continue
+    except genai_errors.APIError as e:
+        print("GenAI API error:", e)
+        return None
+    except Exception as e:
+        print("Unexpected image gen error:", e)
+        return None
 
-        if not resp.generated_images:
-            continue
+    if not resp.generated_images:
+        return None
+
+    generated = resp.generated_images[0]
+    if not generated or not getattr(generated, "image", None):
+        return None
+    return generated.image
+
+def _image_path(story_id: int, idx: int, tier: str) -> str:
+    # final 은 기존 경로 그대로, draft 는 별도 파일로 두고 final 이 오면 교체
+    name = f"{idx:02d}.png" if tier == TIER_FINAL else f"{idx:02d}.{tier}.png"
+    return os.path.join("static", "stories", str(story_id), name)
+
+def render_scene_image(
+    story_title: str,
+    scene_title: str,
+    scene_text: str,
+    scene_idx: int,
+    scene_total: int,
+    file_path: str,
+    user_id=None,
+    priority: int = INTERACTIVE,
+) -> bool:
+    client = providers.get("genai")
+    params = scene_params(scene_title, scene_text, scene_idx, scene_total)
+    prompt = render(PROMPT_TEMPLATES[CURRENT_TEMPLATE_ID], story_title, params)
+    image_obj = _generate_image(client, IMAGEN_MODEL, prompt, user_id=user_id, priority=priority)
+    if image_obj is None:
+        return False
+    _ensure_dir(file_path)
+    image_obj.save(file_path)
+    return True
+
+def create_images_for_story(
+    db: Session,
+    story: StoryLoad,
+    progressive: bool = False,
+    priority: int = INTERACTIVE,
+    pre_rendered: Optional[Dict[int, str]] = None,
+    cancelled: Optional[threading.Event] = None,
+) -> List[StoryImageOut]:
+    client = providers.get("genai")
+    progressive = progressive and PROGRESSIVE_AVAILABLE
+    tier = TIER_DRAFT if progressive else TIER_FINAL
+    model = IMAGEN_DRAFT_MODEL if progressive else IMAGEN_MODEL
 
-        generated = resp.generated_images[0]
-        if not generated or not getattr(generated, "image", None):
+    story_id = story.id
+    user_id = db.query(Story.user_id).filter(Story.id == story_id).scalar()
+    results: List[StoryImageOut] = []
+
+    total = len(story.paragraphs)
+    template_id = ensure_current_template(db)
+    template = PROMPT_TEMPLATES[template_id]
+
+    # 작업을 이어받아 다시 실행하는 경우 이미 저장된 장면은 건너뜀
+    existing = {
+        row.idx: row
+        for row in db.query(StoryImage).filter(StoryImage.story_id == story_id).all()
+    }
+
+    for idx, para in enumerate(story.paragraphs, start=1):
+        if cancelled is not None and cancelled.is_set():
+            # 작업 lease 를 잃음: 남은 장면은 이어받은 worker 가 그림
+            return results
+        if idx in existing:
+            row = existing[idx]
+            results.append(StoryImageOut(idx=idx, file_path=row.file_path, prompt="", tier=row.tier))
             continue
+        params = scene_params(para.title, para.text, idx, total)
+        ready_path = (pre_rendered or {}).get(idx)
+        if ready_path and os.path.exists(ready_path):
+            # speculative draft 에서 이미 final 모델로 그린 장면
+            scene_tier = TIER_FINAL
+            file_path = _image_path(story_id, idx, scene_tier)
+            _ensure_dir(file_path)
+            os.replace(ready_path, file_path)
+        else:
+            prompt = render(template, story.title, params)
+            image_obj = _generate_image(client, model, prompt, user_id=user_id, priority=priority)
+            if image_obj is None:
+                continue
 
-        image_obj = generated.image
-        file_path = os.path.join(out_dir, f"{idx:02d}.png")
-        _ensure_dir(file_path)
-        image_obj.save(file_path) 
+            scene_tier = tier
+            file_path = _image_path(story_id, idx, scene_tier)
+            _ensure_dir(file_path)
+            image_obj.save(file_path) 
+        size_bytes = file_size(file_path)
 
         db.add(StoryImage(
             story_id=story_id,
             idx=idx,
-            prompt=prompt, 
+            prompt=None,
+            prompt_template_id=template_id,
+            prompt_params=json.dumps(params, ensure_ascii=False),
             file_path=file_path,
             mime_type="image/png",
+            size_bytes=size_bytes,
+            tier=scene_tier,
         ))
-        results.append(StoryImageOut(idx=idx, file_path=file_path, prompt=""))
-        time.sleep(0.2)
+        if user_id is not None:
+            add_usage(db, user_id, size_bytes)
+        # 장면마다 커밋: worker 가 죽어도 이어받은 worker 는 남은 장면만 그림
+        try:
+            db.commit()
+        except IntegrityError:
+            # lease 를 잃은 사이 다른 worker 가 같은 장면을 먼저 저장함 (파일 경로는 같음)
+            db.rollback()
+            row = db.query(StoryImage).filter(StoryImage.story_id == story_id, StoryImage.idx == idx).first()
+            if row is not None:
+                results.append(StoryImageOut(idx=idx, file_path=row.file_path, prompt="", tier=row.tier))
+            continue
+        invalidate_story_view(story_id)
+        results.append(StoryImageOut(idx=idx, file_path=file_path, prompt="", tier=scene_tier))
 
-    db.commit()
     return results
+
+def finalize_story_images(story_id: int, cancelled: Optional[threading.Event] = None) -> int:
+    """draft 장면들을 IMAGEN_MODEL 로 다시 그려 교체. 백그라운드 작업용으로 자체 세션을 사용."""
+    db = SessionLocal()
+    replaced = 0
+    try:
+        client = providers.get("genai")
+        story = db.query(Story).filter(Story.id == story_id).first()
+        if story is None:
+            return 0
+        user_id = story.user_id
+        rows = (
+            db.query(StoryImage)
+            .filter(StoryImage.story_id == story_id, StoryImage.tier == TIER_DRAFT)
+            .order_by(StoryImage.idx)
+            .all()
+        )
+        for row in rows:
+            if cancelled is not None and cancelled.is_set():
+                break
+            prompt = render_image_prompt(db, row, story_title=story.title)
+            image_obj = _generate_image(client, IMAGEN_MODEL, prompt, user_id=user_id, priority=REGENERATE)
+            if image_obj is None:
+                # 실패한 장면은 draft 를 그대로 유지
+                continue
+
+            file_path = _image_path(story_id, row.idx, TIER_FINAL)
+            _ensure_dir(file_path)
+            image_obj.save(file_path)
+            size_bytes = file_size(file_path)
+
+            old_path, old_size = row.file_path, row.size_bytes or 0
+            row.file_path = file_path
+            row.size_bytes = size_bytes
+            row.tier = TIER_FINAL
+            if user_id is not None:
+                add_usage(db, user_id, size_bytes - old_size)
+            # 장면마다 커밋해서 페이지가 도착하는 대로 교체할 수 있게
+            db.commit()
+            invalidate_story_view(story_id)
+            replaced += 1
+
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+    finally:
+        db.close()
+    return replaced
@@ -0,0 +1,90 @@
+import os
+import time
+import hashlib
+from dotenv import load_dotenv, find_dotenv
+from app.core import providers
+from app.core.coordination import single_flight
+
+load_dotenv(find_dotenv(), override=False)
+
+# ---------- NAVER TTS ----------
+TTS_API_URL       = "https://naveropenapi.apigw.ntruss.com/tts-premium/v1/tts"
+TTS_CLIENT_ID     = os.getenv("NAVER_CLIENT_ID")
+TTS_CLIENT_SECRET = os.getenv("NAVER_CLIENT_SECRET")
+
+# 같은 (speaker, speed, text) 음성은 파일로 저장해 worker 간 공유
+TTS_CACHE_DIR = os.path.join("static", "tts")
+TTS_CACHE_TTL_SECONDS = float(os.getenv("TTS_CACHE_TTL", "86400"))
+
+
+class TTSError(Exception):
+    def __init__(self, message: str, raw: str = ""):
+        super().__init__(message)
+        self.raw = raw
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(TTS_CACHE_DIR, f"{key}.mp3")
+
+
+def synthesize(text: str, speaker: str, speed: str, path: str) -> str:
+    headers = {
+        "X-NCP-APIGW-API-KEY-ID": TTS_CLIENT_ID,
+        "X-NCP-APIGW-API-KEY":    TTS_CLIENT_SECRET,
+    }
+    data = {
+        "speaker": speaker,
+        "speed":   speed,
+        "text":    text,
+        # "format": "mp3",
+    }
+
+    r = None
+    try:
+        r = providers.get("http").post(TTS_API_URL, headers=headers, data=data, timeout=30)
+        r.raise_for_status()
+    except Exception as e:
+        raise TTSError(str(e), raw=getattr(r, "text", "")) from e
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(r.content)
+    os.replace(tmp, path)
+    return path
+
+
+def synthesize_cached(text: str, speaker: str, speed: str) -> str:
+    key = hashlib.sha1(f"{speaker}|{speed}|{text}".encode("utf-8")).hexdigest()
+    path = _cache_path(key)
+    if os.path.exists(path):
+        return path
+    shared = single_flight(
+        f"tts:{key}",
+        lambda: synthesize(text, speaker, speed, path),
+        encode=str,
+        decode=str,
+        result_ttl=TTS_CACHE_TTL_SECONDS,
+    )
+    # 공유 캐시에는 경로만 있음: 다른 노드가 만든 파일이거나 prune 으로 지워졌으면 여기서 다시 합성
+    if not os.path.exists(shared):
+        return synthesize(text, speaker, speed, path)
+    return shared
+
+
+def prune_tts_cache() -> int:
+    try:
+        names = os.listdir(TTS_CACHE_DIR)
+    except FileNotFoundError:
+        return 0
+    now = time.time()
+    removed = 0
+    for name in names:
+        path = os.path.join(TTS_CACHE_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > TTS_CACHE_TTL_SECONDS:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,109 @@
+import os
+import json
+import hashlib
+from typing import List, Optional
+from fastapi.templating import Jinja2Templates
+from sqlalchemy.orm import Session
+from app.core.coordination import cache_delete, cache_get_json, cache_set_json
+from app.models.story_model import Story, StoryImage
+
+# 저장된 동화를 서버에서 렌더링한 보기 페이지 (/stories/{id}/view)
+# - 내용 버전 = 제목/본문 + 장면 이미지 행 + 템플릿 소스의 해시 → ETag 로 사용
+# - 렌더링한 HTML 은 공유 캐시(coord_cache 또는 Redis)에 버전과 함께 저장
+# - 장면이 새로 그려지면 invalidate_story_view() 로 지움 (버전이 달라지므로 지우지 않아도 재렌더링됨)
+
+STORY_VIEW_TEMPLATE = "story_view.html"
+STORY_VIEW_CACHE_TTL = float(os.getenv("STORY_VIEW_CACHE_TTL", "3600"))
+# 첫 화면에 보이는 장면 수: 이 장면들은 preload, 나머지는 lazy loading
+STORY_VIEW_EAGER_SCENES = int(os.getenv("STORY_VIEW_EAGER_SCENES", "1"))
+
+_templates = Jinja2Templates(directory="templates")
+_template_digest = None
+
+
+def _cache_key(story_id: int) -> str:
+    return f"story_view:{story_id}"
+
+
+def _template_source_digest() -> str:
+    global _template_digest
+    if _template_digest is None:
+        env = _templates.env
+        source, _, _ = env.loader.get_source(env, STORY_VIEW_TEMPLATE)
+        _template_digest = hashlib.sha1(source.encode("utf-8")).hexdigest()
+    return _template_digest
+
+
+def image_url(file_path: str) -> str:
+    # 윈도우에서 저장된 경로(static\stories\...)도 URL 로
+    return "/" + file_path.replace("\\", "/").lstrip("/")
+
+
+def content_version(story: Story, images: List[StoryImage]) -> str:
+    h = hashlib.sha1()
+    h.update(_template_source_digest().encode("ascii"))
+    h.update(json.dumps(
+        [
+            story.title,
+            story.content,
+            [(r.id, r.idx, r.file_path, r.tier, r.size_bytes) for r in images],
+        ],
+        ensure_ascii=False,
+    ).encode("utf-8"))
+    return h.hexdigest()[:20]
+
+
+def _render(story: Story, images: List[StoryImage]) -> str:
+    by_idx = {r.idx: r for r in images}
+    scenes = []
+    for idx, para in enumerate(json.loads(story.content or "[]"), start=1):
+        row = by_idx.get(idx)
+        scenes.append({
+            "idx": idx,
+            "title": para.get("title") or f"장면 {idx}",
+            "text": para.get("text") or "",
+            "image": image_url(row.file_path) if row else None,
+            "tier": row.tier if row else None,
+            "eager": idx <= STORY_VIEW_EAGER_SCENES,
+        })
+    preload = [s["image"] for s in scenes if s["eager"] and s["image"]]
+    return _templates.get_template(STORY_VIEW_TEMPLATE).render(
+        story=story,
+        scenes=scenes,
+        preload=preload,
+        drafting=any(s["tier"] == "draft" for s in scenes),
+    )
+
+
+class StoryView:
+    def __init__(self, story: Story, images: List[StoryImage]):
+        self.story = story
+        self.images = images
+        self.version = content_version(story, images)
+        self.preload = [image_url(r.file_path) for r in images if r.idx <= STORY_VIEW_EAGER_SCENES]
+
+    def html(self) -> str:
+        # 304 로 끝나는 요청은 여기까지 오지 않음
+        key = _cache_key(self.story.id)
+        cached = cache_get_json(key)
+        if cached and cached.get("version") == self.version:
+            return cached["html"]
+        html = _render(self.story, self.images)
+        cache_set_json(key, {"version": self.version, "html": html}, STORY_VIEW_CACHE_TTL)
+        return html
+
+
+def load_story_view(db: Session, story_id: int, user_id: int) -> Optional[StoryView]:
+    story = db.query(Story).filter(Story.id == story_id, Story.user_id == user_id).first()
+    if story is None:
+        return None
+    images = db.query(StoryImage).filter(StoryImage.story_id == story_id).order_by(StoryImage.idx).all()
+    return StoryView(story, images)
+
+
+def invalidate_story_view(story_id: int) -> None:
+    try:
+        cache_delete(_cache_key(story_id))
+    except Exception as e:
+        # 캐시를 못 지워도 버전이 바뀌므로 다음 요청에서 다시 렌더링됨
+        print("story view invalidate failed:", e)
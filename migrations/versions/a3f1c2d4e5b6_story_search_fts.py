@@ -0,0 +1,49 @@
+"""story search fts5
+
+Revision ID: a3f1c2d4e5b6
+Revises: 4d4b8bb3de92
+Create Date: 2025-09-02 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c2d4e5b6'
+down_revision: Union[str, Sequence[str], None] = '4d4b8bb3de92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # rowid = stories.id
+    op.execute(
+        "CREATE VIRTUAL TABLE story_search USING fts5("
+        "title, body, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    # stories 삭제(cascade 포함) 시 인덱스도 같이 정리
+    op.execute(
+        "CREATE TRIGGER stories_search_ad AFTER DELETE ON stories BEGIN "
+        "DELETE FROM story_search WHERE rowid = old.id; "
+        "END"
+    )
+    # 기존 행 백필: content 는 [{title, text}, ...] JSON
+    op.execute(
+        "INSERT INTO story_search(rowid, title, body) "
+        "SELECT s.id, s.title, "
+        "COALESCE((SELECT group_concat("
+        "COALESCE(json_extract(p.value, '$.title'), '') || char(10) || "
+        "COALESCE(json_extract(p.value, '$.text'), ''), char(10)) "
+        "FROM json_each(CASE WHEN json_valid(s.content) THEN s.content ELSE '[]' END) AS p), '') "
+        "FROM stories AS s"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS stories_search_ad")
+    op.execute("DROP TABLE IF EXISTS story_search")
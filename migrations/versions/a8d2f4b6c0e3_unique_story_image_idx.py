@@ -0,0 +1,35 @@
+"""unique story image idx
+
+Revision ID: a8d2f4b6c0e3
+Revises: f2a4c6e8b0d1
+Create Date: 2025-09-13 11:20:41.503318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d2f4b6c0e3'
+down_revision: Union[str, Sequence[str], None] = 'f2a4c6e8b0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 이미 중복 저장된 장면은 먼저 저장된 행만 남김
+    op.execute(
+        "DELETE FROM story_images WHERE id NOT IN ("
+        "SELECT min(id) FROM story_images GROUP BY story_id, idx)"
+    )
+    with op.batch_alter_table('story_images') as batch_op:
+        batch_op.create_unique_constraint('uq_story_images_story_id_idx', ['story_id', 'idx'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('story_images') as batch_op:
+        batch_op.drop_constraint('uq_story_images_story_id_idx', type_='unique')
@@ -0,0 +1,35 @@
+"""storage usage
+
+Revision ID: b7e2d9c1f3a8
+Revises: a3f1c2d4e5b6
+Create Date: 2025-09-03 14:27:05.552190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d9c1f3a8'
+down_revision: Union[str, Sequence[str], None] = 'a3f1c2d4e5b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 기존 행의 size_bytes 는 storage reaper 가 파일 크기로 채움
+    with op.batch_alter_table('story_images') as batch_op:
+        batch_op.add_column(sa.Column('size_bytes', sa.Integer(), server_default='0', nullable=False))
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('storage_bytes', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('storage_bytes')
+    with op.batch_alter_table('story_images') as batch_op:
+        batch_op.drop_column('size_bytes')
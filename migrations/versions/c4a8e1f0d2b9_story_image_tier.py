@@ -0,0 +1,30 @@
+"""story image tier
+
+Revision ID: c4a8e1f0d2b9
+Revises: b7e2d9c1f3a8
+Create Date: 2025-09-05 09:41:18.730442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a8e1f0d2b9'
+down_revision: Union[str, Sequence[str], None] = 'b7e2d9c1f3a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('story_images') as batch_op:
+        batch_op.add_column(sa.Column('tier', sa.String(), server_default='final', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('story_images') as batch_op:
+        batch_op.drop_column('tier')
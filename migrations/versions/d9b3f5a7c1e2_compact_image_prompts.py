@@ -0,0 +1,137 @@
+"""compact image prompts
+
+Revision ID: d9b3f5a7c1e2
+Revises: c4a8e1f0d2b9
+Create Date: 2025-09-08 16:03:52.194877
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9b3f5a7c1e2'
+down_revision: Union[str, Sequence[str], None] = 'c4a8e1f0d2b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TEMPLATE_ID = 1
+
+# v1 템플릿 스냅샷: 앱 코드(prompt_service)가 바뀌어도 이 마이그레이션 결과는 그대로여야 하므로 복사해 둠
+_BASE_STYLE_V1 = (
+    "아래 원칙을 모든 장면에 동일하게 적용해.\n"
+    "- 동화 제목: {story_title}\n"
+    "- 주인공의 외형/의상/헤어스타일/소품은 첫 장면에서 정한 설정을 끝까지 유지해.\n"
+    "- 장면에 언급되지 않은 인물/사물/문구는 넣지 마.\n"
+    "- 그림에 글자/워터마크/로고/텍스트를 넣지 마.\n"
+    "- 따뜻한 색감, 부드러운 일러스트, 아동 친화적 스타일, 1:1 구도.\n"
+    "- 배경은 장면에 필요한 요소만 간결하게.\n"
+    "\nApply the following rules consistently across all scenes:\n"
+    "- Story title: {story_title}\n"
+    "- Keep the main character's appearance/outfit/hair/props consistent across scenes.\n"
+    "- Do NOT add any characters/objects/text that are not mentioned.\n"
+    "- No text/watermark/logo in the image.\n"
+    "- Warm palette, soft children's illustration style, square (1:1) composition.\n"
+    "- Keep backgrounds minimal and relevant to the scene.\n"
+)
+
+_SCENE_PROMPT_V1 = (
+    "아래의 장면 설명과 규칙을 ‘정확히’ 반영한 유아용 동화 일러스트 1장을 생성해.\n"
+    + _BASE_STYLE_V1 + "\n"
+    "[장면 {scene_idx}/{scene_total}]\n"
+    "- 장면 제목: {scene_title}\n"
+    "- 장면 요약: {scene_text}\n"
+    "- 반드시 요약에 언급된 행동/감정/사물 중심으로 그려.\n"
+    "- 추가 인물/소품을 임의로 만들지 마.\n"
+    "- 카메라 구도는 주인공과 핵심 사건이 한눈에 보이도록.\n"
+    "\nGenerate ONE children's story illustration that matches the scene EXACTLY.\n"
+    + _BASE_STYLE_V1 + "\n"
+    "[Scene {scene_idx}/{scene_total}]\n"
+    "- Scene title: {scene_title}\n"
+    "- Scene summary (Korean): {scene_text}\n"
+    "- Depict ONLY what is described (characters, objects, emotions, actions).\n"
+    "- Do NOT invent extra characters or items.\n"
+    "- Ensure the main character is clearly visible; keep the same look as previous scenes.\n"
+)
+
+TEMPLATE_BODY = _SCENE_PROMPT_V1
+
+
+def _scene_params(scene_title, scene_text, scene_idx, scene_total) -> dict:
+    return {
+        "scene_title": scene_title,
+        "scene_text": scene_text,
+        "scene_idx": scene_idx,
+        "scene_total": scene_total,
+    }
+
+
+def _render(template_body: str, story_title: str, params: dict) -> str:
+    return template_body.format(story_title=story_title, **params)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    prompt_templates = op.create_table('prompt_templates',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(prompt_templates, [{'id': TEMPLATE_ID, 'body': TEMPLATE_BODY}])
+
+    with op.batch_alter_table('story_images') as batch_op:
+        batch_op.alter_column('prompt', existing_type=sa.String(), nullable=True)
+        batch_op.add_column(sa.Column('prompt_template_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('prompt_params', sa.Text(), nullable=True))
+        batch_op.create_foreign_key('fk_story_images_prompt_template_id', 'prompt_templates', ['prompt_template_id'], ['id'])
+
+    # 저장된 프롬프트를 템플릿으로 똑같이 재현할 수 있는 행만 압축 (예전 형식 행은 그대로 둠)
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT si.id, si.idx, si.prompt, s.title, s.content "
+        "FROM story_images si JOIN stories s ON s.id = si.story_id "
+        "WHERE si.prompt IS NOT NULL"
+    )).all()
+    for row in rows:
+        try:
+            paragraphs = json.loads(row.content or "[]")
+            para = paragraphs[row.idx - 1]
+        except (ValueError, IndexError, TypeError):
+            continue
+        params = _scene_params(para.get("title", ""), para.get("text", ""), row.idx, len(paragraphs))
+        if _render(TEMPLATE_BODY, row.title, params) != row.prompt:
+            continue
+        bind.execute(
+            sa.text(
+                "UPDATE story_images SET prompt = NULL, prompt_template_id = :tid, prompt_params = :params "
+                "WHERE id = :id"
+            ),
+            {"tid": TEMPLATE_ID, "params": json.dumps(params, ensure_ascii=False), "id": row.id},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT si.id, si.prompt_params, s.title, t.body "
+        "FROM story_images si "
+        "JOIN stories s ON s.id = si.story_id "
+        "JOIN prompt_templates t ON t.id = si.prompt_template_id "
+        "WHERE si.prompt IS NULL"
+    )).all()
+    for row in rows:
+        prompt = _render(row.body, row.title, json.loads(row.prompt_params or "{}"))
+        bind.execute(sa.text("UPDATE story_images SET prompt = :prompt WHERE id = :id"), {"prompt": prompt, "id": row.id})
+    bind.execute(sa.text("UPDATE story_images SET prompt = '' WHERE prompt IS NULL"))
+
+    with op.batch_alter_table('story_images') as batch_op:
+        batch_op.drop_constraint('fk_story_images_prompt_template_id', type_='foreignkey')
+        batch_op.drop_column('prompt_params')
+        batch_op.drop_column('prompt_template_id')
+        batch_op.alter_column('prompt', existing_type=sa.String(), nullable=False)
+    op.drop_table('prompt_templates')
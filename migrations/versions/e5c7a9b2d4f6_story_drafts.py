@@ -0,0 +1,48 @@
+"""story drafts
+
+Revision ID: e5c7a9b2d4f6
+Revises: d9b3f5a7c1e2
+Create Date: 2025-09-10 11:18:27.406613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c7a9b2d4f6'
+down_revision: Union[str, Sequence[str], None] = 'd9b3f5a7c1e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('speculate', sa.Boolean(), server_default='0', nullable=False))
+    op.create_table('story_drafts',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('image_path', sa.String(), nullable=True),
+    sa.Column('created_at', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_story_drafts_user_id'), 'story_drafts', ['user_id'], unique=False)
+    op.create_index(op.f('ix_story_drafts_key'), 'story_drafts', ['key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_story_drafts_key'), table_name='story_drafts')
+    op.drop_index(op.f('ix_story_drafts_user_id'), table_name='story_drafts')
+    op.drop_table('story_drafts')
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('speculate')